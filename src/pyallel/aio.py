@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import asyncio
+import codecs
+import errno
+import signal
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Union
+
+from pyallel.process import Process
+from pyallel.process_group import ProcessGroup
+from pyallel.process_group_manager import link_process_groups, parse_process_groups
+from pyallel.scheduler import dependencies_succeeded
+
+
+@dataclass(frozen=True)
+class Started:
+    """A process was started"""
+
+    process: Process
+
+
+@dataclass(frozen=True)
+class Output:
+    """A process produced output"""
+
+    process: Process
+    data: str
+
+
+@dataclass(frozen=True)
+class Exited:
+    """A process exited, all of its output has been sent before this event"""
+
+    process: Process
+    return_code: int
+
+
+@dataclass(frozen=True)
+class Skipped:
+    """A process will never be started, because a process it depends on failed or it was interrupted"""
+
+    process: Process
+
+
+Event = Union[Started, Output, Exited, Skipped]
+
+
+class AsyncProcessGroupManager:
+    """Runs process groups on an asyncio event loop, reporting what happens as a stream of events
+
+    Processes are scheduled the same way as `ProcessGroupManager` does, so each process waits for its
+    dependencies to succeed and at most `jobs` processes run at once (0 doesn't limit how many can run),
+    but no signal handlers are installed and nothing blocks the event loop
+
+        manager = AsyncProcessGroupManager.from_args("mypy .", "black --check .")
+        async for event in manager.events():
+            ...
+    """
+
+    def __init__(self, process_groups: list[ProcessGroup], jobs: int = 0) -> None:
+        link_process_groups(process_groups)
+        self.jobs = jobs
+        self.process_groups = process_groups
+        self._queue: list[tuple[ProcessGroup, Process]] = [
+            (pg, process) for pg in process_groups for process in pg.processes
+        ]
+        self._running: dict[Process, asyncio.subprocess.Process | None] = {}
+        self._tasks: dict[Process, asyncio.Task[None]] = {}
+        self._events: asyncio.Queue[Event] | None = None
+
+    @property
+    def exit_code(self) -> int | None:
+        """0 if every process succeeded, 1 if any failed or were skipped and None until they have all finished"""
+        processes = [p for pg in self.process_groups for p in pg.processes]
+        if any(not p.end and not p.skipped for p in processes):
+            return None
+
+        return 1 if any(p.skipped or p.return_code() for p in processes) else 0
+
+    async def events(self) -> AsyncIterator[Event]:
+        """Run the process groups, yielding an event each time something happens to a process
+
+        Running processes are killed if the iteration is stopped before they have finished
+        """
+        self._events = asyncio.Queue()
+        try:
+            while self._queue or self._tasks or not self._events.empty():
+                for event in self._schedule():
+                    yield event
+
+                if not self._tasks and self._events.empty():
+                    break
+
+                event = await self._events.get()
+                if isinstance(event, Exited):
+                    await self._tasks.pop(event.process)
+                yield event
+        finally:
+            self.kill()
+            tasks = list(self._tasks.values())
+            self._tasks.clear()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _schedule(self) -> list[Event]:
+        """Skip the processes that can no longer run and start as many of the others as there are free job slots"""
+        events: list[Event] = []
+        queue: list[tuple[ProcessGroup, Process]] = []
+        for pg, process in self._queue:
+            succeeded = dependencies_succeeded(process)
+            if succeeded is False or process.skipped:
+                process.skip()
+                events.append(Skipped(process))
+                continue
+
+            if (
+                not succeeded
+                or (self.jobs and len(self._tasks) >= self.jobs)
+                or (pg.jobs and self._running_in_group(pg) >= pg.jobs)
+            ):
+                queue.append((pg, process))
+                continue
+
+            process.start = time.perf_counter()
+            process.watched = True
+            self._running[process] = None
+            self._tasks[process] = asyncio.ensure_future(self._run(process))
+
+        self._queue = queue
+        return events
+
+    def _running_in_group(self, process_group: ProcessGroup) -> int:
+        return sum(1 for process in process_group.processes if process in self._tasks)
+
+    async def _run(self, process: Process) -> None:
+        assert self._events is not None
+        argv = process.argv()
+        try:
+            try:
+                proc = await self._create_subprocess(process, argv)
+            except OSError as e:
+                if argv is None or e.errno != errno.ENOEXEC or process.shell is not None:
+                    raise
+
+                # Like `Process.run`, an executable file without a #! line is run as a shell script
+                argv = None
+                proc = await self._create_subprocess(process, argv)
+        except OSError as e:
+            if argv is not None:
+                self._events.put_nowait(
+                    Output(process, f"pyallel: {argv[0]}: {e.strerror}\n")
+                )
+            self._exited(process, 127 if isinstance(e, FileNotFoundError) else 126)
+            return
+        except asyncio.CancelledError:
+            # asyncio takes care of a process that was started as the task was cancelled
+            self._cancelled(process, -signal.SIGKILL)
+            raise
+
+        self._running[process] = proc
+        self._events.put_nowait(Started(process))
+
+        assert proc.stdout is not None
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            while True:
+                chunk = await proc.stdout.read(65536)
+                data = decoder.decode(chunk, final=not chunk)
+                if data:
+                    self._events.put_nowait(Output(process, data))
+                if not chunk:
+                    break
+            return_code = await proc.wait()
+        except asyncio.CancelledError:
+            # Reap the process before giving up on it, otherwise its transport is left to be
+            # closed after the event loop has gone
+            if proc.returncode is None:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    # It has already exited (or been killed by `kill`) but not been reaped yet
+                    pass
+            self._cancelled(process, await proc.wait())
+            raise
+
+        self._exited(process, return_code)
+
+    async def _create_subprocess(
+        self, process: Process, argv: list[str] | None
+    ) -> asyncio.subprocess.Process:
+        if argv is None:
+            return await asyncio.create_subprocess_shell(
+                process.command,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+
+        # Like `Process.run`, commands that don't need a shell are run directly
+        return await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+
+    def _exited(self, process: Process, return_code: int) -> None:
+        assert self._events is not None
+        self._running.pop(process, None)
+        process.finish(return_code)
+        self._events.put_nowait(Exited(process, return_code))
+
+    def _cancelled(self, process: Process, return_code: int) -> None:
+        # Nothing is reading the events any more, but the exit is still recorded so `exit_code` is known
+        self._running.pop(process, None)
+        process.finish(return_code)
+
+    def send_signal(self, signum: int) -> None:
+        for proc in self._running.values():
+            if proc is not None and proc.returncode is None:
+                try:
+                    proc.send_signal(signum)
+                except ProcessLookupError:
+                    pass
+
+    def interrupt(self) -> None:
+        """Send a SIGINT to the running processes and skip the queued processes so they are never started"""
+        for _, process in self._queue:
+            process.skip()
+        self.send_signal(signal.SIGINT)
+
+    def kill(self) -> None:
+        """Kill the running processes and skip the queued processes so they are never started"""
+        for _, process in self._queue:
+            process.skip()
+        self.send_signal(signal.SIGKILL)
+
+    @classmethod
+    def from_args(cls, *args: str, jobs: int = 0) -> AsyncProcessGroupManager:
+        return cls(parse_process_groups(*args), jobs=jobs)
+
+
+def run(*args: str, jobs: int = 0) -> AsyncIterator[Event]:
+    """Run commands (with the same syntax as the command line) and return an async iterator of what happens to them
+
+        async for event in run("mypy .", "black --check .", ":::", "pytest"):
+            if isinstance(event, Output):
+                print(event.data, end="")
+    """
+    return AsyncProcessGroupManager.from_args(*args, jobs=jobs).events()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import os
+import shlex
+from typing import IO
+
+from pyallel.errors import ArgumentTooLongError
+
+PLACEHOLDER = "{}"
+# Linux limits the length of a single argument to 32 pages, and commands are run with `sh -c` so
+# the whole command is passed to the shell as one argument
+MAX_ARG_STRLEN = 32 * 4096
+
+
+def read_args(file: IO[str]) -> list[str]:
+    """Return the arguments in a file, one per line, skipping blank lines"""
+    return [arg for line in file if (arg := line.rstrip("\r\n")).strip()]
+
+
+def max_command_length() -> int:
+    """Return the most bytes a command can be, leaving room for the environment like xargs does"""
+    try:
+        arg_max = os.sysconf("SC_ARG_MAX")
+    except (ValueError, OSError):
+        arg_max = MAX_ARG_STRLEN
+
+    environ = sum(len(key) + len(value) + 2 for key, value in os.environb.items())
+    return max(min(arg_max - environ - 2048, MAX_ARG_STRLEN) - 1, 0)
+
+
+def batch_args(
+    args: list[str],
+    templates: list[str],
+    jobs: int = 1,
+    max_args: int = 0,
+    max_chars: int = 0,
+) -> list[list[str]]:
+    """Split arguments into batches that each fill the placeholders of the templates in one command
+
+    Batches hold at most `max_args` arguments each (0 doesn't limit how many they hold), and are kept
+    short enough that every template filled with them is at most `max_chars` bytes long (0 uses the
+    longest command that can be run). Arguments are spread evenly so there are at least as many batches
+    as `jobs` when there are enough arguments, then a batch is split again wherever it gets too long
+    """
+    if not args:
+        return []
+
+    max_chars = max_chars or max_command_length()
+    # The length of each template without its placeholders, and how many times the arguments are
+    # inserted into it
+    lengths = [
+        (
+            len(template.encode()) - len(PLACEHOLDER) * template.count(PLACEHOLDER),
+            template.count(PLACEHOLDER),
+        )
+        for template in templates
+    ]
+
+    def fits(length: int) -> bool:
+        return all(base + count * length <= max_chars for base, count in lengths)
+
+    count = len(args) if not max_args else max_args
+    batches = max(-(-len(args) // count), min(max(jobs, 1), len(args)))
+    size, extra = divmod(len(args), batches)
+
+    split: list[list[str]] = []
+    start = 0
+    for i in range(batches):
+        end = start + size + (i < extra)
+        batch: list[str] = []
+        length = 0
+        for arg in args[start:end]:
+            quoted = len(shlex.quote(arg).encode())
+            if not fits(quoted):
+                raise ArgumentTooLongError(
+                    f"argument {arg[:50]!r} is too long to fit in a command of at most {max_chars} bytes"
+                )
+
+            added = quoted + 1 if batch else quoted
+            if batch and not fits(length + added):
+                split.append(batch)
+                batch, length, added = [], 0, quoted
+
+            batch.append(arg)
+            length += added
+
+        split.append(batch)
+        start = end
+
+    return split
+
+
+def expand_commands(
+    args: list[str],
+    commands: list[str],
+    jobs: int = 1,
+    max_args: int = 0,
+    max_chars: int = 0,
+) -> list[str]:
+    """Replace each command containing a placeholder with one command for each batch of arguments
+
+    Commands without a placeholder (and group separators) are kept as they are
+    """
+    templates = [command for command in commands if PLACEHOLDER in command]
+    batches = batch_args(args, templates, jobs, max_args, max_chars)
+
+    expanded: list[str] = []
+    for command in commands:
+        if command not in templates:
+            expanded.append(command)
+            continue
+
+        for batch in batches:
+            expanded.append(command.replace(PLACEHOLDER, shlex.join(batch)))
+
+    return expanded
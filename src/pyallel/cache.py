@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import os
+
+from pyallel.history import cache_dir
+
+
+def default_path() -> str:
+    return os.path.join(cache_dir(), "results")
+
+
+class Cache:
+    """Remembers the output of commands that succeeded, so they can be skipped when nothing they depend on has changed
+
+    A result is keyed by a hash of the command, the directory it was run in, the values of the environment
+    variables in its env modifier and the contents of the files matched by its inputs modifier. File contents
+    are only hashed again when their modification time or size changes
+
+    Results are stored as one file each, the least recently used results are removed once they take up more
+    than `max_size` bytes
+    """
+
+    # The most bytes of output to keep across all results
+    MAX_SIZE = 100 * 1024 * 1024
+
+    def __init__(self, path: str | None = None, max_size: int = MAX_SIZE) -> None:
+        self.path = path or default_path()
+        self.max_size = max_size
+        self._cwd = os.getcwd()
+        self._digests: dict[str, list[int | str]] | None = None
+        self._digests_changed = False
+
+    @property
+    def _digests_path(self) -> str:
+        return os.path.join(self.path, "digests.json")
+
+    def _load_digests(self) -> dict[str, list[int | str]]:
+        if self._digests is not None:
+            return self._digests
+
+        self._digests = {}
+        try:
+            with open(self._digests_path, encoding="utf-8") as f:
+                digests = json.load(f)
+            if isinstance(digests, dict):
+                self._digests = digests
+        except (OSError, ValueError):
+            pass
+
+        return self._digests
+
+    def _save_digests(self) -> None:
+        if not self._digests_changed:
+            return
+
+        self._digests_changed = False
+        tmp = f"{self._digests_path}.{os.getpid()}"
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._digests, f)
+            os.replace(tmp, self._digests_path)
+        except OSError:
+            pass
+
+    def _digest(self, path: str) -> str:
+        """Return the hash of a file's contents, reusing the last hash if its modification time and size haven't changed"""
+        digests = self._load_digests()
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return ""
+
+        known = digests.get(path)
+        if known and known[:2] == [stat.st_mtime_ns, stat.st_size]:
+            return str(known[2])
+
+        digest = hashlib.sha256()
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(65536), b""):
+                    digest.update(block)
+        except OSError:
+            return ""
+
+        digests[path] = [stat.st_mtime_ns, stat.st_size, digest.hexdigest()]
+        self._digests_changed = True
+        return digest.hexdigest()
+
+    def key(self, command: str, inputs: list[str], env: list[str]) -> str:
+        """Return the key of the result of running the command with the current inputs and environment"""
+        key = hashlib.sha256()
+        key.update(json.dumps([self._cwd, command]).encode())
+        for name in sorted(env):
+            key.update(json.dumps([name, os.environ.get(name)]).encode())
+
+        paths = sorted(
+            {
+                path
+                for pattern in inputs
+                for path in glob.glob(pattern, recursive=True)
+                if os.path.isfile(path)
+            }
+        )
+        for path in paths:
+            key.update(json.dumps([path, self._digest(path)]).encode())
+
+        self._save_digests()
+        return key.hexdigest()
+
+    def get(self, key: str) -> bytes | None:
+        """Return the output stored for the key, or None if there isn't a result for it"""
+        path = os.path.join(self.path, key)
+        try:
+            with open(path, "rb") as f:
+                output = f.read()
+            # Mark the result as recently used so it is removed last
+            os.utime(path)
+        except OSError:
+            return None
+
+        return output
+
+    def put(self, key: str, output: bytes) -> None:
+        # Not being able to write a result only means the command is run again next time
+        path = os.path.join(self.path, key)
+        tmp = f"{path}.{os.getpid()}"
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(output)
+            os.replace(tmp, path)
+        except OSError:
+            return
+
+        self._evict()
+
+    def _evict(self) -> None:
+        results: list[tuple[float, int, str]] = []
+        try:
+            with os.scandir(self.path) as entries:
+                for entry in entries:
+                    if entry.name == "digests.json" or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    results.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+
+        size = sum(result[1] for result in results)
+        for _, result_size, path in sorted(results):
+            if size <= self.max_size:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= result_size
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from abc import ABC, abstractmethod
+
+
+class Capture(ABC):
+    """Stores the output of a process as it is drained from its stdout pipe, so it can be read back"""
+
+    @abstractmethod
+    def write(self, data: bytes) -> None: ...
+
+    @abstractmethod
+    def read(self) -> bytes:
+        """Read all output written since the last read"""
+
+    @abstractmethod
+    def readline(self) -> bytes:
+        """Read the next line of output, or whatever is available if the line isn't complete yet"""
+
+    @abstractmethod
+    def read_all(self) -> bytes:
+        """Read all output that has been read so far from the start, returns nothing if the output isn't kept"""
+
+    @abstractmethod
+    def contents(self) -> bytes | None:
+        """Read all output that has been written from the start, whether it has been read or not,
+        returns None if the output isn't kept
+        """
+
+    def copy_to(self, fd: int) -> int:
+        """Write all output written since the last read to a file descriptor without decoding it,
+        returning the number of bytes written
+        """
+        data = self.read()
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view) :]
+        return len(data)
+
+    def close(self) -> None:
+        pass
+
+
+class FileCapture(Capture):
+    """Stores output in a file that is unlinked as soon as it is created, so it is cleaned up
+    when it is closed (or pyallel exits) no matter what
+    """
+
+    def __init__(self, directory: str | None = None) -> None:
+        self._fd, path = tempfile.mkstemp(prefix="pyallel-", dir=directory)
+        os.unlink(path)
+        self._size = 0
+        self._offset = 0
+
+    def __del__(self) -> None:
+        self.close()
+
+    def write(self, data: bytes) -> None:
+        while data:
+            written = os.write(self._fd, data)
+            self._size += written
+            data = data[written:]
+
+    def _pread(self, size: int, offset: int) -> bytes:
+        chunks: list[bytes] = []
+        end = offset + size
+        while offset < end:
+            chunk = os.pread(self._fd, end - offset, offset)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            offset += len(chunk)
+        return b"".join(chunks)
+
+    def read(self) -> bytes:
+        data = self._pread(self._size - self._offset, self._offset)
+        self._offset += len(data)
+        return data
+
+    def readline(self) -> bytes:
+        line = b""
+        while self._offset < self._size:
+            chunk = self._pread(min(self._size - self._offset, 8192), self._offset)
+            newline = chunk.find(b"\n")
+            if newline != -1:
+                chunk = chunk[: newline + 1]
+            line += chunk
+            self._offset += len(chunk)
+            if newline != -1:
+                break
+        return line
+
+    def read_all(self) -> bytes:
+        return self._pread(self._offset, 0)
+
+    def copy_to(self, fd: int) -> int:
+        # Have the kernel copy the output straight from the file, so it is never read into memory
+        copied = 0
+        while self._offset < self._size:
+            try:
+                sent = os.sendfile(
+                    fd, self._fd, self._offset, self._size - self._offset
+                )
+            except OSError:
+                # sendfile only supports writing to sockets on some platforms (such as macOS)
+                return copied + super().copy_to(fd)
+
+            if not sent:
+                break
+            self._offset += sent
+            copied += sent
+        return copied
+
+    def contents(self) -> bytes | None:
+        return self._pread(self._size, 0)
+
+    def close(self) -> None:
+        if getattr(self, "_fd", -1) >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class SharedMemoryCapture(FileCapture):
+    """Stores output in a file on the /dev/shm tmpfs"""
+
+    def __init__(self) -> None:
+        super().__init__(directory="/dev/shm")
+
+
+class MemfdCapture(FileCapture):
+    """Stores output in an anonymous memory backed file created with `memfd_create` (Linux only)"""
+
+    def __init__(self) -> None:
+        self._fd = os.memfd_create("pyallel", os.MFD_CLOEXEC)
+        self._size = 0
+        self._offset = 0
+
+
+class PipeCapture(Capture):
+    """Doesn't store output, it is only held in memory until it is read"""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> None:
+        self._buffer += data
+
+    def read(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+    def readline(self) -> bytes:
+        newline = self._buffer.find(b"\n")
+        end = newline + 1 if newline != -1 else len(self._buffer)
+        line = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        return line
+
+    def read_all(self) -> bytes:
+        return b""
+
+    def contents(self) -> bytes | None:
+        return None
+
+
+CAPTURES: dict[str, type[Capture]] = {"file": FileCapture}
+if hasattr(os, "memfd_create"):
+    CAPTURES["memfd"] = MemfdCapture
+if os.path.isdir("/dev/shm"):
+    CAPTURES["shm"] = SharedMemoryCapture
+CAPTURES["pipe"] = PipeCapture
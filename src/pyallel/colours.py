@@ -13,6 +13,8 @@ class Colours:
     blue_bold: str = "\033[1;34m"
     red_bold: str = "\033[1;31m"
     yellow_bold: str = "\033[1;33m"
+    magenta_bold: str = "\033[1;35m"
+    cyan_bold: str = "\033[1;36m"
     clear_line: str = "\033[2K"
     clear_screen: str = "\033[2J"
     save_cursor: str = "\033[s"
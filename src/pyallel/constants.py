@@ -4,16 +4,25 @@ import sys
 
 IN_TTY = sys.stdout.isatty()
 CLEAR_LINE = "\033[2K"
-UP_LINE = "\033[1F"
+# Move the cursor to the start of the line a number of lines up or down, and clear everything below the cursor
+UP_LINES = "\033[{}F"
+DOWN_LINES = "\033[{}E"
+CLEAR_DOWN = "\033[J"
+# Begin and end a synchronized update (DEC mode 2026), terminals that don't support it ignore these
+SYNC_START = "\033[?2026h"
+SYNC_END = "\033[?2026l"
 ANSI_ESCAPE = re.compile(r"(\x9B|\x1B\[|\x1B\()[0-?]*[ -\/]*[@-~]")
 
 if IN_TTY:
+    # Looking up the terminal size is a system call, so it is only done again when the terminal
+    # is resized (see `refresh_terminal_size`)
+    _TERMINAL_SIZE = shutil.get_terminal_size()
 
     def COLUMNS() -> int:
-        return shutil.get_terminal_size().columns
+        return _TERMINAL_SIZE.columns
 
     def LINES() -> int:
-        return shutil.get_terminal_size().lines
+        return _TERMINAL_SIZE.lines
 
 else:
 
@@ -24,8 +33,26 @@ else:
         return sys.maxsize
 
 
+def refresh_terminal_size() -> None:
+    """Look up the size of the terminal again, which should be called when a SIGWINCH is received"""
+    global _TERMINAL_SIZE
+    _TERMINAL_SIZE = shutil.get_terminal_size()
+
+
 ICONS = ("/", "-", "\\", "|")
 
 # Unicode character bytes to render different symbols in the terminal
 TICK = "\u2714"
 X = "\u2718"
+
+# The shortest time allowed between two redraws of the interactive view when processes are producing
+# lots of output, and the longest time between redraws when only the spinners and timers change
+MIN_FRAME_INTERVAL = 1 / 30
+IDLE_FRAME_INTERVAL = 1.0
+
+# How many seconds a process that has finished still has its output shown when there isn't room
+# to show the output of every process
+RECENTLY_ACTIVE = 5.0
+
+# The most characters of a command (or its name) used to tag its lines of output in interleaved mode
+MAX_TAG_WIDTH = 20
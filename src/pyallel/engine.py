@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import os
+import selectors
+import signal
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from pyallel.process import Process
+
+OUTPUT = 1
+EXIT = 2
+
+
+class Engine:
+    """Waits on the stdout pipes and exits of running processes and wakes up only when there is new output,
+    a process exits or something (such as a signal handler) asks it to wake up
+    """
+
+    def __init__(self) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ)
+        # Processes that are still running but don't have a pidfd to tell us when they exit
+        self._active: set[Process] = set()
+        self._child_signals = False
+        self._child_exited = False
+
+    def __del__(self) -> None:
+        try:
+            self._selector.close()
+            os.close(self._wakeup_read)
+            os.close(self._wakeup_write)
+        except (AttributeError, OSError):
+            pass
+
+    def register(self, process: Process) -> None:
+        process.watched = True
+        fd = process.fileno()
+        if fd >= 0:
+            self._register(fd, (OUTPUT, process))
+
+        exit_fd = process.exit_fileno()
+        if exit_fd >= 0:
+            self._register(exit_fd, (EXIT, process))
+        else:
+            self._active.add(process)
+
+    def _register(self, fd: int, data: tuple[int, Process]) -> None:
+        # A process can close its pipe or pidfd outside of `wait` (e.g. when its output is read to the end),
+        # so the fd may still be registered to a process that has finished. Its number can only be
+        # reused once it was closed, so that registration is stale and is replaced
+        self.unregister(fd)
+        self._selector.register(fd, selectors.EVENT_READ, data)
+
+    def unregister(self, fd: int) -> None:
+        try:
+            self._selector.unregister(fd)
+        except (KeyError, ValueError):
+            pass
+
+    def wakeup(self) -> None:
+        # Safe to call from a signal handler, if the pipe is full a wakeup is already pending
+        try:
+            os.write(self._wakeup_write, b"\0")
+        except OSError:
+            pass
+
+    def watch_child_signals(self) -> None:
+        """Only poll processes that don't have a pidfd after a SIGCHLD is received
+
+        Must be called from the main thread
+        """
+        signal.signal(signal.SIGCHLD, self._handle_child_signal)
+        self._child_signals = True
+
+    def _handle_child_signal(self, _signum: int, _frame: Any) -> None:
+        self._child_exited = True
+        self.wakeup()
+
+    def wait(self, timeout: float | None = None) -> list[Process]:
+        """Wait until there is something to do and return the processes that produced output or exited
+
+        Output is moved into each process's capture file and exit codes are recorded here,
+        so they can be read as normal afterwards
+        """
+        processes: list[Process] = []
+
+        for key, _ in self._selector.select(timeout):
+            if key.data is None:
+                self._drain_wakeup()
+                continue
+
+            event, process = key.data
+            if event == OUTPUT:
+                if not process.drain():
+                    self.unregister(key.fd)
+            else:
+                self.unregister(key.fd)
+                if process.reap() is None:
+                    # Only a process run by a shell worker can be woken up without having exited,
+                    # by the worker reporting that it has started
+                    self._register(key.fd, key.data)
+                    continue
+            processes.append(process)
+
+        if self._active and (self._child_exited or not self._child_signals):
+            self._child_exited = False
+            for process in list(self._active):
+                if process.reap() is not None:
+                    self._active.discard(process)
+                    processes.append(process)
+
+        # A process can both close its pipe and exit in the same wait
+        return list(dict.fromkeys(processes))
+
+    def reap(self) -> None:
+        """Record the exit codes of processes that have exited without waiting"""
+        self.wait(0)
+
+    def _drain_wakeup(self) -> None:
+        try:
+            while os.read(self._wakeup_read, 1024):
+                pass
+        except BlockingIOError:
+            pass
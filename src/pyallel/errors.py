@@ -1,2 +1,34 @@
-class InvalidLinesModifierError(Exception):
+class InvalidModifierError(Exception):
+    """Raised when a command or process group modifier is invalid"""
+
+
+class InvalidLinesModifierError(InvalidModifierError):
     """Raised when the lines modifier is invalid"""
+
+
+class InvalidJobsModifierError(InvalidModifierError):
+    """Raised when the jobs modifier is invalid"""
+
+
+class InvalidNameModifierError(InvalidModifierError):
+    """Raised when the name modifier is invalid or the same name is used by more than one command"""
+
+
+class InvalidAfterModifierError(InvalidModifierError):
+    """Raised when the after modifier is invalid, refers to an unknown command or creates a dependency cycle"""
+
+
+class InvalidInputsModifierError(InvalidModifierError):
+    """Raised when the inputs modifier is invalid"""
+
+
+class InvalidEnvModifierError(InvalidModifierError):
+    """Raised when the env modifier is invalid"""
+
+
+class InvalidShellModifierError(InvalidModifierError):
+    """Raised when the shell modifier is invalid"""
+
+
+class ArgumentTooLongError(Exception):
+    """Raised when an argument is too long to fit in a command"""
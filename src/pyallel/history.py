@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+import os
+
+
+def cache_dir() -> str:
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache, "pyallel")
+
+
+def default_path() -> str:
+    return os.path.join(cache_dir(), "history.jsonl")
+
+
+class History:
+    """Remembers how long commands took to run, so the longest commands can be started first
+
+    Durations are appended to a JSON lines file (one record per line) and are keyed by the command
+    and the directory it was run in, the estimate for a command is an exponentially weighted average
+    of its previous durations so it follows commands that get slower or faster over time
+
+    Only the `max_entries` most recently run commands are remembered, the others are forgotten
+    when the file is compacted
+    """
+
+    # How much the latest duration counts towards the estimate
+    WEIGHT = 0.5
+    MAX_ENTRIES = 10000
+
+    def __init__(self, path: str | None = None, max_entries: int = MAX_ENTRIES) -> None:
+        self.path = path or default_path()
+        self.max_entries = max_entries
+        self._cwd = os.getcwd()
+        self._estimates: dict[tuple[str, str], float] | None = None
+        # The number of records in the file
+        self._records = 0
+
+    def _load(self) -> dict[tuple[str, str], float]:
+        if self._estimates is not None:
+            return self._estimates
+
+        self._estimates = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        key = (record["cwd"], record["command"])
+                        duration = float(record["duration"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+
+                    self._records += 1
+                    self._update(key, duration)
+        except OSError:
+            return self._estimates
+
+        self._maybe_compact()
+        return self._estimates
+
+    def _update(self, key: tuple[str, str], duration: float) -> None:
+        assert self._estimates is not None
+        previous = self._estimates.pop(key, None)
+        if previous is not None:
+            duration = self.WEIGHT * duration + (1 - self.WEIGHT) * previous
+        self._estimates[key] = duration
+
+        # Dicts keep the order keys were added in, so the least recently run command is first
+        while len(self._estimates) > self.max_entries:
+            del self._estimates[next(iter(self._estimates))]
+
+    def _maybe_compact(self) -> None:
+        # The file is only ever appended to, so rewrite it with one record per remembered command
+        # once it is mostly made up of old or forgotten records
+        assert self._estimates is not None
+        if self._records > 2 * len(self._estimates) + 1000:
+            self._compact()
+
+    def _compact(self) -> None:
+        assert self._estimates is not None
+        tmp = f"{self.path}.{os.getpid()}"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for (cwd, command), duration in self._estimates.items():
+                    f.write(_dumps(cwd, command, duration))
+            os.replace(tmp, self.path)
+        except OSError:
+            return
+
+        self._records = len(self._estimates)
+
+    def estimate(self, command: str) -> float | None:
+        """Return how long the command is expected to take in seconds, or None if it has never been run"""
+        return self._load().get((self._cwd, command))
+
+    def record(self, command: str, duration: float) -> None:
+        self._load()
+        self._update((self._cwd, command), duration)
+
+        # Not being able to write the history only means commands aren't ordered by how long they take
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(_dumps(self._cwd, command, duration))
+        except OSError:
+            return
+
+        # Compact while running too, so running lots of different commands doesn't grow the file
+        self._records += 1
+        self._maybe_compact()
+
+
+def _dumps(cwd: str, command: str, duration: float) -> str:
+    return (
+        json.dumps({"cwd": cwd, "command": command, "duration": round(duration, 3)})
+        + "\n"
+    )
@@ -1,59 +1,134 @@
 from __future__ import annotations
 
 import importlib.metadata
+import os
+import signal
 import sys
 import traceback
-import time
+from typing import Any
 
 from pyallel import constants
+from pyallel.batching import PLACEHOLDER, expand_commands, read_args
+from pyallel.cache import Cache
 from pyallel.colours import Colours
-from pyallel.errors import InvalidLinesModifierError
+from pyallel.errors import ArgumentTooLongError, InvalidModifierError
+from pyallel.history import History
 from pyallel.parser import Arguments, create_parser
-from pyallel.printer import Printer
+from pyallel.pool import ShellPool
+from pyallel.printer import Printer, tag_width
+from pyallel.process import ProcessOutput
+from pyallel.process_feed import ProcessFeed, read_commands
 from pyallel.process_group_manager import ProcessGroupManager
+from pyallel.renderer import Renderer
 
 
 def run_interactive(
     process_group_manager: ProcessGroupManager, printer: Printer
 ) -> int:
-    while True:
-        process_group_manager.stream()
+    renderer = Renderer(process_group_manager, printer)
+
+    def handle_resize(_signum: int, _frame: Any) -> None:
+        constants.refresh_terminal_size()
+        renderer.update()
+
+    signal.signal(signal.SIGWINCH, handle_resize)
+    renderer.start()
+    try:
+        return _run_interactive(process_group_manager, printer, renderer)
+    finally:
+        renderer.stop()
+
 
-        printer.clear_printed_lines()
-        output = process_group_manager.get_cur_process_group_output()
-        printer.print_progress_group_output(
-            output, process_group_manager._interrupt_count
-        )
+def _run_interactive(
+    process_group_manager: ProcessGroupManager, printer: Printer, renderer: Renderer
+) -> int:
+    exit_code = 0
+    while True:
+        with renderer.lock:
+            process_group_manager.stream()
+            poll = process_group_manager.poll()
 
-        poll = process_group_manager.poll()
         if poll is not None:
+            renderer.stop()
+            output = process_group_manager.get_cur_process_group_output()
             printer.clear_printed_lines()
             printer.print_progress_group_output(
                 output, process_group_manager._interrupt_count, tail_output=False
             )
 
+            # Commands that depend on a failed command are skipped, but commands in later
+            # process groups that don't depend on it can still run
             if poll > 0:
-                return poll
+                exit_code = poll
 
             printer.reset()
             process_group_manager.run()
             if not process_group_manager.next():
-                return 0
+                return exit_code
+            renderer.start()
+            # The processes of the next group may have already finished (e.g. they were started
+            # early because of an after= modifier), so there may be nothing left to wake up a wait
+            continue
+
+        # Reading output isn't held up by drawing it, the renderer is only told to draw a new
+        # frame when a process produces output or exits, or a signal is received
+        interrupt_count = process_group_manager._interrupt_count
+        if (
+            process_group_manager.wait()
+            or process_group_manager._interrupt_count != interrupt_count
+        ):
+            renderer.update()
+
+
+def next_or_wait(
+    process_group_manager: ProcessGroupManager, exit_code: int
+) -> tuple[int, bool]:
+    """Move on to the next process group if the current one has finished, otherwise wait until
+    something happens
 
-        time.sleep(0.1)
+    Returns the exit code so far and whether every process group has finished
+    """
+    poll = process_group_manager.poll()
+    if poll is None:
+        process_group_manager.wait()
+        return exit_code, False
+
+    # Commands that depend on a failed command are skipped, but commands in later
+    # process groups that don't depend on it can still run
+    if poll > 0:
+        exit_code = poll
+
+    # The processes of the next group may have already finished (e.g. they were started early
+    # because of an after= modifier), so there may be nothing left to wake up a wait
+    process_group_manager.run()
+    return exit_code, not process_group_manager.next()
 
 
 def run_non_interactive(
     process_group_manager: ProcessGroupManager, printer: Printer
 ) -> int:
+    exit_code = 0
     current_process = None
+    printed: set[int] = set()
 
     while True:
         outputs = process_group_manager.stream()
 
         for pg in outputs.process_group_outputs.values():
             for output in pg.processes:
+                if output.id in printed:
+                    continue
+
                 if current_process is None:
+                    if output.process.skipped:
+                        printer.print_process_output(output, include_output=False)
+                        printed.add(output.id)
+                        continue
+
+                    # Print the output of each process in order, so wait for this one to be started
+                    if output.process.queued:
+                        break
+
                     current_process = output.process
                     output = process_group_manager.get_process(output.id)
                     printer.print_process_output(
@@ -64,20 +139,181 @@ def run_non_interactive(
                 else:
                     printer.print_process_output(output, include_cmd=False)
 
-                if output.process.poll() is not None:
+                if output.process.return_code() is not None:
                     printer.print_process_output(output, include_output=False)
+                    printed.add(output.id)
                     current_process = None
 
-        poll = process_group_manager.poll()
+        exit_code, done = next_or_wait(process_group_manager, exit_code)
+        if done:
+            return exit_code
+
+
+def run_interleaved(
+    process_group_manager: ProcessGroupManager, printer: Printer
+) -> int:
+    exit_code = 0
+    # Output that doesn't end in a newline yet, which is held back until its line is complete
+    partial: dict[int, str] = {}
+    printed: set[int] = set()
+
+    while True:
+        outputs = process_group_manager.stream()
+
+        for pg in outputs.process_group_outputs.values():
+            width = tag_width(pg)
+            for output in pg.processes:
+                if output.id in printed:
+                    continue
+
+                finished = (
+                    output.process.skipped or output.process.return_code() is not None
+                )
+                lines = (partial.pop(output.id, "") + output.data).splitlines(
+                    keepends=True
+                )
+                if lines and not lines[-1].endswith("\n") and not finished:
+                    partial[output.id] = lines.pop()
+
+                if lines or finished:
+                    printer.print_tagged_output(
+                        output, lines, width, include_status=finished
+                    )
+                if finished:
+                    printed.add(output.id)
+
+        exit_code, done = next_or_wait(process_group_manager, exit_code)
+        if done:
+            return exit_code
+
+
+def run_grouped(
+    process_group_manager: ProcessGroupManager, printer: Printer
+) -> int:
+    exit_code = 0
+    printed: set[int] = set()
+
+    while True:
+        # Output isn't read until a process finishes, until then it is kept in the process's capture
+        process_group_manager.update()
+
+        if process_group_manager.next():
+            pg = process_group_manager.get_cur_process_group_output()
+            finished = [
+                output.process
+                for output in pg.processes
+                if output.id not in printed
+                and (output.process.skipped or output.process.return_code() is not None)
+            ]
+            for process in sorted(finished, key=lambda process: process.end):
+                output = ProcessOutput(
+                    id=process.id, process=process, data=process.read().decode()
+                )
+                # End every block with a newline so the next one starts on its own line
+                printer.print_process_output(
+                    output, include_output=not process.skipped, append_newlines=True
+                )
+                printed.add(process.id)
+
+        exit_code, done = next_or_wait(process_group_manager, exit_code)
+        if done:
+            return exit_code
+
+
+def run_raw(
+    process_group_manager: ProcessGroupManager, printer: Printer
+) -> int:
+    exit_code = 0
+    current_process = None
+    printed: set[int] = set()
+
+    while True:
+        # Output is copied from each process's capture as it is, so it is never read by pyallel itself
+        process_group_manager.update()
+
+        if process_group_manager.next():
+            pg = process_group_manager.get_cur_process_group_output()
+            for output in pg.processes:
+                if output.id in printed:
+                    continue
+
+                if output.process.skipped:
+                    printer.print_process_output(output, include_output=False)
+                    printed.add(output.id)
+                    continue
+
+                # Print the output of each process in order, so wait for this one to be started
+                if output.process.queued:
+                    break
+
+                if current_process is not output.process:
+                    current_process = output.process
+                    printer.print_process_output(
+                        output,
+                        include_output=False,
+                        include_progress=False,
+                        include_timer=False,
+                    )
+
+                printer.print_raw_output(output)
+                if output.process.return_code() is None:
+                    break
+
+                printer.print_process_output(output, include_output=False)
+                printed.add(output.id)
+                current_process = None
+
+        exit_code, done = next_or_wait(process_group_manager, exit_code)
+        if done:
+            return exit_code
+
+
+def run_feed(process_feed: ProcessFeed, printer: Printer) -> int:
+    while True:
+        # Each process is forgotten once its output has been printed, so memory use doesn't grow
+        # with the number of commands
+        for process in process_feed.update():
+            output = ProcessOutput(
+                id=process.id, process=process, data=process.read().decode()
+            )
+            printer.print_process_output(output)
+
+        poll = process_feed.poll()
         if poll is not None:
-            if poll > 0:
-                return poll
+            return poll
 
-            process_group_manager.run()
-            if not process_group_manager.next():
-                return 0
+        process_feed.wait()
 
-        time.sleep(0.1)
+
+def run_process_groups(
+    commands: list[str],
+    parsed_args: Arguments,
+    printer: Printer,
+    interactive: bool,
+    jobs: int,
+    pool: ShellPool | None,
+) -> int:
+    process_group_manager = ProcessGroupManager.from_args(
+        *commands,
+        scrollback=parsed_args.scrollback,
+        capture=parsed_args.capture,
+        jobs=jobs,
+        history=History() if parsed_args.history else None,
+        cache=Cache() if parsed_args.cache else None,
+        pool=pool,
+    )
+    process_group_manager.run()
+
+    if interactive:
+        return run_interactive(process_group_manager, printer)
+    elif parsed_args.output == "interleaved":
+        return run_interleaved(process_group_manager, printer)
+    elif parsed_args.output == "grouped":
+        return run_grouped(process_group_manager, printer)
+    elif parsed_args.output == "raw":
+        return run_raw(process_group_manager, printer)
+    else:
+        return run_non_interactive(process_group_manager, printer)
 
 
 def run(*args: str) -> int:
@@ -89,34 +325,70 @@ def run(*args: str) -> int:
         print(my_version)
         return 0
 
-    if not parsed_args.commands:
+    if parsed_args.commands_from is not None and parsed_args.commands:
+        parser.error("commands can't be given as well as --commands-from")
+
+    if parsed_args.args_from is not None and not any(
+        PLACEHOLDER in command for command in parsed_args.commands
+    ):
+        parser.error(f"--args-from needs a command with a {PLACEHOLDER} placeholder")
+
+    if not parsed_args.commands and parsed_args.commands_from is None:
         parser.print_help()
         return 2
 
-    colours = Colours.from_colour(parsed_args.colour)
-    printer = Printer(colours, timer=parsed_args.timer)
-
     interactive = True
     if not parsed_args.interactive:
         interactive = False
     elif not constants.IN_TTY:
         interactive = False
 
+    colours = Colours.from_colour(parsed_args.colour)
+    printer = Printer(
+        colours,
+        timer=parsed_args.timer,
+        sync=interactive and parsed_args.sync_output,
+    )
+
+    jobs = parsed_args.jobs or os.cpu_count() or 1
+    pool = None
     message = None
     try:
-        process_group_manager = ProcessGroupManager.from_args(*parsed_args.commands)
-        process_group_manager.run()
+        if parsed_args.shell_pool and ShellPool.supported():
+            pool = ShellPool(jobs)
 
-        if interactive:
-            exit_code = run_interactive(process_group_manager, printer)
+        if parsed_args.commands_from is not None:
+            process_feed = ProcessFeed.from_commands(
+                read_commands(parsed_args.commands_from),
+                capture=parsed_args.capture,
+                jobs=jobs,
+                history=History() if parsed_args.history else None,
+                cache=Cache() if parsed_args.cache else None,
+                pool=pool,
+            )
+            exit_code = run_feed(process_feed, printer)
         else:
-            exit_code = run_non_interactive(process_group_manager, printer)
-    except InvalidLinesModifierError as e:
+            commands = parsed_args.commands
+            if parsed_args.args_from is not None:
+                commands = expand_commands(
+                    read_args(parsed_args.args_from),
+                    commands,
+                    jobs=jobs,
+                    max_args=parsed_args.max_args,
+                    max_chars=parsed_args.max_chars,
+                )
+            exit_code = run_process_groups(
+                commands, parsed_args, printer, interactive, jobs, pool
+            )
+    except (InvalidModifierError, ArgumentTooLongError) as e:
         exit_code = 1
         message = str(e)
     except Exception:
         exit_code = 1
         message = traceback.format_exc()
+    finally:
+        if pool is not None:
+            pool.close()
 
     if exit_code == 1:
         if not message:
@@ -1,13 +1,32 @@
 from __future__ import annotations
 
-from argparse import ArgumentParser, RawTextHelpFormatter
-from typing import Literal
+from argparse import (
+    ArgumentParser,
+    ArgumentTypeError,
+    FileType,
+    RawTextHelpFormatter,
+)
+from typing import IO, Literal
+
+from pyallel.capture import CAPTURES
 
 
 class Arguments:
+    cache: bool
+    capture: str
     colour: Literal["yes", "no", "auto"]
     commands: list[str]
+    commands_from: IO[str] | None
+    args_from: IO[str] | None
+    max_args: int
+    max_chars: int
+    history: bool
     interactive: bool
+    jobs: int
+    output: Literal["ordered", "interleaved", "grouped", "raw"]
+    scrollback: int
+    shell_pool: bool
+    sync_output: bool
     timer: bool
     version: bool
 
@@ -21,7 +40,7 @@ class Arguments:
 
 COMMANDS_HELP = r"""list of quoted commands to run in parallel e.g "mypy ." "black ."
 
-each command is executed inside a shell, so shell syntax is supported as
+each command is executed inside a shell when it needs one, so shell syntax is supported as
 if you were running the command directly in a shell, some examples are below
 
      "MYPY_FORCE_COLOR=1 mypy ."          <- provide environment variables
@@ -31,6 +50,9 @@ if you were running the command directly in a shell, some examples are below
      "echo \$SHELL" or "\$(echo mypy .)"  <- expand variables and commands to evaluate (must be escaped)
      "pytest . && mypy . || echo failed!" <- use AND (&&) and OR (||) to run commands conditionally
 
+commands that are just a program and its (optionally quoted) arguments are run directly without
+starting a shell, which is faster (see the shell modifier)
+
 PROCESS GROUPS
 --------------
 commands can be grouped using the group separator symbol (:::)
@@ -39,8 +61,16 @@ commands can be grouped using the group separator symbol (:::)
 
 the above will print "boil kettle" and sleep for 1 second first before printing "make coffee"
 
-command groups are ran in the sequence you provide them, and if a command group fails
-(if a command fails inside the command group) the rest of the command groups in the sequence are not run
+command groups are ran in the sequence you provide them, each command waits for every command in
+the previous command group to succeed, and if a command fails the commands waiting on it are not run
+
+modifiers can be set for a command group by adding them after the group separator symbol,
+the modifiers for the first command group can be set by starting with a group separator
+
+jobs:
+    the jobs modifier limits how many commands in the command group can run at once (see --jobs)
+
+        %(prog)s "::: jobs=1" "echo boil kettle" "echo get cup" ::: "echo make coffee"
 
 COMMAND MODIFIERS
 -----------------
@@ -52,9 +82,56 @@ lines (only used in interactive mode):
         %(prog)s "lines=90 :: echo running long command..." "echo running other command..."
 
     90 is expressed as a percentage value, which must be between 1 and 100 inclusive
+
+name:
+    the name modifier gives the command a name so other commands can depend on it using the after modifier
+
+after:
+    the after modifier is a comma separated list of named commands that must succeed before the command is run,
+    it replaces waiting for the previous command group, so the command starts as soon as those commands succeed
+
+        %(prog)s "name=lint :: ruff ." "name=build :: make" ::: "after=build :: make test" "make docs"
+
+    above "make test" starts as soon as "make" succeeds, without waiting for "ruff ."
+
+inputs:
+    the inputs modifier is a comma separated list of files (or glob patterns) the command reads,
+    when none of them have changed since the command last succeeded it isn't run again and its
+    previous output is shown instead (see --no-cache)
+
+        %(prog)s "inputs=src/**/*.py,pyproject.toml :: mypy ." "inputs=src/**/*.py :: black --check ."
+
+env (only used with the inputs modifier):
+    the env modifier is a comma separated list of environment variables the command uses,
+    the command is run again when any of their values change
+
+        %(prog)s "inputs=src/**/*.py env=PYTHONPATH :: mypy ."
+
+shell:
+    the shell modifier sets whether the command is run inside a shell (yes) or run directly (no),
+    by default a shell is only used when the command needs one. With no, the command is split into
+    arguments like a shell would, but shell syntax such as pipes and variables is passed on as it is
+
+        %(prog)s "shell=no :: grep -r 'TODO|FIXME' src" "shell=yes :: make"
+
+multiple modifiers are separated by spaces e.g "name=build lines=50 :: make"
 """
 
 
+def non_negative_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise ArgumentTypeError(f"must be 0 or more, got {number}")
+    return number
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise ArgumentTypeError(f"must be 1 or more, got {number}")
+    return number
+
+
 def create_parser() -> ArgumentParser:
     parser = ArgumentParser(
         prog="pyallel",
@@ -66,6 +143,41 @@ def create_parser() -> ArgumentParser:
         help=COMMANDS_HELP,
         nargs="*",
     )
+    parser.add_argument(
+        "--commands-from",
+        help="read commands to run from a file (or stdin with -), one per line, instead of the command line\n"
+        "commands are read as job slots become free and each command's output is printed when it finishes,\n"
+        "so any number of commands can be run (the inputs and env modifiers are supported)",
+        type=FileType("r"),
+        default=None,
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--args-from",
+        help="read arguments from a file (or stdin with -), one per line, each command containing {} is run\n"
+        "once for each batch of arguments with {} replaced by them (quoted), e.g\n\n"
+        '    %(prog)s --args-from files.txt "black {}"\n\n'
+        "batches are spread evenly across the job slots (see --max-args and --max-chars)",
+        type=FileType("r"),
+        default=None,
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--max-args",
+        help="the most arguments from --args-from to put in each command, 0 puts in as many as fit\n"
+        "(see --max-chars), defaults to %(default)s",
+        type=non_negative_int,
+        default=0,
+        metavar="N",
+    )
+    parser.add_argument(
+        "--max-chars",
+        help="the longest a command filled with arguments from --args-from can be in bytes,\n"
+        "defaults to the longest command the system can run",
+        type=non_negative_int,
+        default=0,
+        metavar="N",
+    )
     parser.add_argument(
         "-t",
         "--no-timer",
@@ -82,6 +194,54 @@ def create_parser() -> ArgumentParser:
         dest="interactive",
         default=True,
     )
+    parser.add_argument(
+        "--output",
+        help="how output is printed in non-interactive mode, defaults to %(default)s\n\n"
+        "    ordered     <- the output of each command is printed in full, one command at a time\n"
+        "    interleaved <- lines are printed as soon as they are complete, tagged with their command\n"
+        "    grouped     <- the output of each command is printed in full as soon as it finishes\n"
+        "    raw         <- like ordered, but output is copied as it is without a prefix, which is\n"
+        "                   the fastest way to print commands with lots of output\n",
+        choices=("ordered", "interleaved", "grouped", "raw"),
+        default="ordered",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="maximum number of commands to run at once, defaults to the number of CPUs",
+        type=positive_int,
+        default=0,
+        metavar="N",
+    )
+    parser.add_argument(
+        "--no-history",
+        help="don't remember how long commands take to run, which is used to start the\n"
+        "longest running commands first when there are more commands than --jobs",
+        action="store_false",
+        dest="history",
+        default=True,
+    )
+    parser.add_argument(
+        "--no-cache",
+        help="always run commands, even when they have the inputs modifier and their inputs haven't changed",
+        action="store_false",
+        dest="cache",
+        default=True,
+    )
+    parser.add_argument(
+        "--shell-pool",
+        help="start a shell for each job slot up front and run the commands that need a shell in them,\n"
+        "which is faster for lots of very short commands (Linux only, ignored elsewhere)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--sync-output",
+        help="ask the terminal to draw each frame at once in interactive mode, which stops flickering\n"
+        "in terminals that support synchronized updates (others ignore it)",
+        action="store_true",
+        default=False,
+    )
     parser.add_argument(
         "-V",
         "--version",
@@ -95,5 +255,23 @@ def create_parser() -> ArgumentParser:
         choices=("yes", "no", "auto"),
         default="auto",
     )
+    parser.add_argument(
+        "--scrollback",
+        help="number of lines of output to keep in memory for each command, older output is read\n"
+        "back from disk when needed (0 keeps all output in memory), defaults to %(default)s",
+        type=non_negative_int,
+        default=10000,
+        metavar="LINES",
+    )
+    parser.add_argument(
+        "--capture",
+        help="where to store the output of each command, defaults to %(default)s\n\n"
+        "    file  <- an unlinked temporary file in $TMPDIR\n"
+        "    memfd <- an anonymous file in memory (Linux only)\n"
+        "    shm   <- an unlinked file in /dev/shm\n"
+        "    pipe  <- nowhere, output is only kept in memory (see --scrollback)\n",
+        choices=tuple(CAPTURES),
+        default="file",
+    )
 
     return parser
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import os
+import select
+import shlex
+import subprocess
+
+
+class ShellJob:
+    """A command being run by a shell worker, with the parts of `subprocess.Popen` that `Process` uses"""
+
+    def __init__(self, worker: ShellWorker, output: int) -> None:
+        # The pid of the subshell running the command, once the worker has reported it
+        self.pid: int | None = None
+        self.returncode: int | None = None
+        self._worker = worker
+        # The write end of the pipe the command's output goes to, kept open until the command
+        # has finished so the worker can always open it
+        self._output = output
+        self._signal: int | None = None
+
+    def fileno(self) -> int:
+        """A file descriptor that becomes readable when the worker reports on the command"""
+        return self._worker.fileno()
+
+    def poll(self) -> int | None:
+        if self.returncode is None:
+            self._worker.update()
+        return self.returncode
+
+    def wait(self) -> int:
+        while self.returncode is None:
+            select.select([self.fileno()], [], [])
+            self.poll()
+        return self.returncode
+
+    def send_signal(self, signum: int) -> None:
+        if self.poll() is not None:
+            return
+
+        # The command hasn't started yet, so send the signal as soon as it has
+        if self.pid is None:
+            self._signal = signum
+            return
+
+        try:
+            os.kill(self.pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def started(self, pid: int) -> None:
+        self.pid = pid
+        if self._signal is not None:
+            self.send_signal(self._signal)
+
+    def exited(self, returncode: int) -> None:
+        self.returncode = returncode
+        os.close(self._output)
+
+
+class ShellWorker:
+    """A shell that keeps running commands sent to it on its stdin, so starting the shell (and loading
+    its startup files) only happens once rather than for every command
+
+    Each command runs in a subshell, so it can't change the shell for the commands after it. The worker
+    reports the pid of the subshell and then its exit status as lines on its stdout, while the output of
+    the command goes straight to a pipe of pyallel's, opened through /proc
+    """
+
+    def __init__(self) -> None:
+        self._process = subprocess.Popen(
+            ["/bin/sh", "-s"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        assert self._process.stdin is not None and self._process.stdout is not None
+        self._stdin = self._process.stdin
+        self._stdout = self._process.stdout.fileno()
+        os.set_blocking(self._stdout, False)
+        self._buffer = b""
+        self.job: ShellJob | None = None
+        # Keep the worker alive when the terminal sends a SIGINT, the subshells running commands get
+        # the default handler back so they are still interrupted. Save stdout as fd 3 so subshells can
+        # report their pid on it after redirecting their own output
+        self._send("trap : INT\nexec 3>&1\n")
+
+    def fileno(self) -> int:
+        return self._stdout
+
+    def alive(self) -> bool:
+        return self._process.poll() is None
+
+    def run(self, command: str, output: int) -> ShellJob:
+        """Run a command with its output (and errors) written to the pipe `output`, which is closed
+        once the command has finished
+        """
+        job = ShellJob(self, output)
+        self.job = job
+        self._send(
+            # /proc/self is the subshell itself when read by a builtin
+            '( read -r pid _ </proc/self/stat; echo "p $pid" >&3; exec 3>&-; '
+            f"eval {shlex.quote(command)} ) "
+            f'</dev/null >/proc/{os.getpid()}/fd/{output} 2>&1; echo "s $?"\n'
+        )
+        return job
+
+    def _send(self, script: str) -> None:
+        try:
+            self._stdin.write(script.encode())
+            self._stdin.flush()
+        except BrokenPipeError:
+            # The worker has died, the job finishes once its exit is noticed in `update`
+            pass
+
+    def update(self) -> None:
+        """Read what the worker has reported about its job"""
+        while True:
+            try:
+                data = os.read(self._stdout, 4096)
+            except BlockingIOError:
+                break
+
+            if not data:
+                # The worker has died, so its job won't be reported on
+                if self.job is not None:
+                    self.job.exited(self._process.wait())
+                    self.job = None
+                return
+
+            self._buffer += data
+
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            kind, _, value = line.partition(b" ")
+            if self.job is None or not value.isdigit():
+                continue
+
+            if kind == b"p":
+                self.job.started(int(value))
+            elif kind == b"s":
+                self.job.exited(int(value))
+                self.job = None
+
+    def close(self) -> None:
+        # The worker exits once it reaches the end of its stdin
+        try:
+            self._stdin.close()
+        except BrokenPipeError:
+            pass
+        self._process.wait()
+
+
+class ShellPool:
+    """Shell workers started up front, one for each job slot, for running commands that need a shell"""
+
+    def __init__(self, size: int) -> None:
+        self._workers = [ShellWorker() for _ in range(size)]
+
+    @staticmethod
+    def supported() -> bool:
+        """Return True if shell workers can write to the pipes of pyallel, which needs /proc (Linux only)"""
+        return os.path.isdir(f"/proc/{os.getpid()}/fd")
+
+    def run(self, command: str, output: int) -> ShellJob | None:
+        """Run a command on an idle worker, which takes care of closing the pipe `output`,
+        or return None if every worker is busy
+        """
+        for i, worker in enumerate(self._workers):
+            if worker.job is not None:
+                continue
+
+            if not worker.alive():
+                worker.close()
+                worker = self._workers[i] = ShellWorker()
+
+            return worker.run(command, output)
+
+        return None
+
+    def close(self) -> None:
+        for worker in self._workers:
+            worker.close()
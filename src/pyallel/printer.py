@@ -1,29 +1,37 @@
 from __future__ import annotations
 
+import sys
 import time
+import unicodedata
+from functools import lru_cache
+from typing import Sequence
 
 from pyallel import constants
 from pyallel.colours import Colours
-from pyallel.process import ProcessOutput
+from pyallel.process import Process, ProcessOutput
 from pyallel.process_group import ProcessGroupOutput
 
 
 class Printer:
-    def __init__(self, colours: Colours | None = None, timer: bool = False) -> None:
+    def __init__(
+        self, colours: Colours | None = None, timer: bool = False, sync: bool = False
+    ) -> None:
         self._colours = colours or Colours()
         self._timer = timer
+        # Wrap each write in the synchronized update escape sequences, so terminals that support them
+        # show everything that was written at once instead of drawing it as it arrives
+        self._sync = sync
+        # Lines are buffered until they are flushed, so they are written all at once
+        self._buffer: list[str] = []
         self._prefix = f"{self._colours.dim_on}=>{self._colours.dim_off} "
         self._icon = 0
         self._printed: list[tuple[bool, str, str]] = []
+        # The lines currently drawn on the screen by `render_progress_group_output`
+        self._screen: list[str] = []
 
-    def write(
-        self,
-        line: str,
-        include_prefix: bool = False,
-        end: str = "\n",
-        flush: bool = False,
-        truncate: bool = False,
-    ) -> None:
+    def format(
+        self, line: str, include_prefix: bool = False, truncate: bool = False
+    ) -> str:
         truncate_num = 0
         prefix = self._prefix if include_prefix else ""
         if prefix:
@@ -32,30 +40,59 @@ class Printer:
             columns = constants.COLUMNS() - truncate_num
             if get_num_lines(line, columns) > 1:
                 line = truncate_line(line, columns)
-        print(f"{prefix}{line}", end=end, flush=flush)
+        return f"{prefix}{line}"
+
+    def write(
+        self,
+        line: str,
+        include_prefix: bool = False,
+        end: str = "\n",
+        flush: bool = False,
+        truncate: bool = False,
+    ) -> None:
+        self._buffer.append(self.format(line, include_prefix, truncate))
+        self._buffer.append(end)
+        if flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write everything that has been buffered with a single write"""
+        if not self._buffer:
+            return
+
+        out = "".join(self._buffer)
+        self._buffer.clear()
+        if self._sync:
+            out = f"{constants.SYNC_START}{out}{constants.SYNC_END}"
+        sys.stdout.write(out)
+        sys.stdout.flush()
 
     def info(self, msg: str) -> None:
         self.write(
             f"{self._colours.white_bold}{msg}{self._colours.reset_colour}",
             include_prefix=False,
+            flush=True,
         )
 
     def ok(self, msg: str) -> None:
         self.write(
             f"{self._colours.green_bold}{msg}{self._colours.reset_colour}",
             include_prefix=False,
+            flush=True,
         )
 
     def warn(self, msg: str) -> None:
         self.write(
             f"{self._colours.yellow_bold}{msg}{self._colours.reset_colour}",
             include_prefix=False,
+            flush=True,
         )
 
     def error(self, msg: str) -> None:
         self.write(
             f"{self._colours.red_bold}{msg}{self._colours.reset_colour}",
             include_prefix=False,
+            flush=True,
         )
 
     def generate_process_output(
@@ -83,14 +120,10 @@ class Printer:
             self._printed.append(line_parts)
 
         if include_output:
-            lines = output.data.splitlines(keepends=True)
-
             if tail_output:
-                output_lines = output.process.lines - 1
-                if output_lines == 0:
-                    lines = []
-                else:
-                    lines = lines[-output_lines:]
+                lines = output.tail(output.process.lines - 1)
+            else:
+                lines = output.full().splitlines(keepends=True)
 
             for line in lines:
                 prefix = True
@@ -124,7 +157,7 @@ class Printer:
 
         passed = None
         icon = ""
-        poll = output.process.poll()
+        poll = output.process.return_code()
         if include_progress:
             icon = constants.ICONS[self._icon]
             if poll is not None:
@@ -138,6 +171,14 @@ class Printer:
             colour = self._colours.red_bold
             msg = "failed"
             icon = constants.X
+        elif output.process.skipped:
+            colour = self._colours.yellow_bold
+            msg = "skipped"
+            icon = ""
+        elif output.process.queued:
+            colour = self._colours.white_bold
+            msg = "queued"
+            icon = ""
         else:
             colour = self._colours.white_bold
             msg = "running"
@@ -146,13 +187,24 @@ class Printer:
                 msg += "..."
 
         timer = ""
-        if include_timer:
+        if include_timer and output.process.cached:
+            timer = "(cached)"
+        elif include_timer and output.process.start:
             end = output.process.end
             if not output.process.end:
                 end = time.perf_counter()
             elapsed = end - output.process.start
             timer = f"({format_time_taken(elapsed)})"
 
+            # Show how much longer the process is expected to take, or how long it has overrun by,
+            # which tells apart a process that is stalled from one that is slow
+            estimate = output.process.estimate
+            if not output.process.end and estimate is not None:
+                if elapsed <= estimate:
+                    timer = f"({format_time_taken(elapsed)}, ~{format_time_taken(estimate - elapsed)} left)"
+                else:
+                    timer = f"({format_time_taken(elapsed)}, {format_time_taken(elapsed - estimate)} over)"
+
         command = output.process.command
         if get_num_lines(output.process.command) > 1:
             columns = constants.COLUMNS() - (len(msg) + len(timer) + 9)
@@ -170,12 +222,31 @@ class Printer:
         output: ProcessGroupOutput,
         interrupt_count: int = 0,
         tail_output: bool = True,
+        eta: tuple[float | None, float | None] = (None, None),
     ) -> list[tuple[bool, str, str]]:
-        set_process_lines(output, interrupt_count)
+        eta_line = ""
+        if tail_output and self._timer:
+            eta_line = self.generate_eta(*eta)
+
+        lines = constants.LINES() - 1
+        if eta_line:
+            lines -= 1
+
+        # When there isn't a line for every process, a summary of how many processes are in each state
+        # is shown above the processes that there is room for
+        if tail_output and len(output.processes) > lines - (
+            2 if interrupt_count else 0
+        ):
+            self._printed.append((False, self.generate_summary(output), "\n"))
+            lines -= 1
+        set_process_lines(output, interrupt_count, lines)
 
         for out in output.processes:
             self.generate_process_output(out, tail_output, append_newlines=True)
 
+        if eta_line:
+            self._printed.append((False, eta_line, "\n"))
+
         if interrupt_count == 1:
             self._printed.append((False, "", "\n"))
             self._printed.append(
@@ -201,6 +272,49 @@ class Printer:
 
         return self._printed
 
+    def generate_summary(self, output: ProcessGroupOutput) -> str:
+        running = done = failed = skipped = queued = 0
+        for process_output in output.processes:
+            process = process_output.process
+            return_code = process.return_code()
+            if return_code == 0:
+                done += 1
+            elif return_code is not None:
+                failed += 1
+            elif process.skipped:
+                skipped += 1
+            elif process.queued:
+                queued += 1
+            else:
+                running += 1
+
+        parts = [
+            f"{self._colours.white_bold}{len(output.processes)} commands:{self._colours.reset_colour}"
+        ]
+        for count, msg, colour in (
+            (running, "running", self._colours.white_bold),
+            (done, "done", self._colours.green_bold),
+            (failed, "failed", self._colours.red_bold),
+            (skipped, "skipped", self._colours.yellow_bold),
+            (queued, "queued", self._colours.white_bold),
+        ):
+            if count:
+                parts.append(f"{colour}{count} {msg}{self._colours.reset_colour}")
+
+        return " ".join(parts)
+
+    def generate_eta(self, process_group_eta: float | None, eta: float | None) -> str:
+        parts: list[str] = []
+        if process_group_eta is not None:
+            parts.append(f"group ~{format_time_taken(process_group_eta)}")
+        if eta is not None:
+            parts.append(f"all ~{format_time_taken(eta)}")
+
+        if not parts:
+            return ""
+
+        return f"{self._colours.dim_on}ETA: {', '.join(parts)}{self._colours.dim_off}"
+
     def print_process_output(
         self,
         output: ProcessOutput,
@@ -209,6 +323,7 @@ class Printer:
         include_output: bool = True,
         include_progress: bool = True,
         include_timer: bool | None = None,
+        append_newlines: bool = False,
     ) -> None:
         for include_prefix, line, end in self.generate_process_output(
             output,
@@ -217,36 +332,142 @@ class Printer:
             include_output,
             include_progress,
             include_timer,
+            append_newlines,
         ):
             self.write(line, include_prefix, end)
 
         # Force a flush otherwise lines that don't end in a newline character will not get printed as they are read
-        self.write("", include_prefix=False, end="", flush=True)
+        self.flush()
+
+    def generate_tag(self, output: ProcessOutput, width: int) -> str:
+        """Return the tag that marks the lines printed for a process, coloured by its id"""
+        colours = (
+            self._colours.blue_bold,
+            self._colours.green_bold,
+            self._colours.yellow_bold,
+            self._colours.magenta_bold,
+            self._colours.cyan_bold,
+        )
+        colour = colours[(output.id - 1) % len(colours)]
+        tag = process_tag(output.process)[:width].ljust(width)
+        return f"{colour}{tag}{self._colours.reset_colour} {self._colours.dim_on}|{self._colours.dim_off} "
+
+    def print_tagged_output(
+        self,
+        output: ProcessOutput,
+        lines: list[str],
+        width: int,
+        include_status: bool = False,
+    ) -> None:
+        """Print complete lines of output from a process, each starting with the tag of the process,
+        followed by the status of the process if include_status is True
+        """
+        tag = self.generate_tag(output, width)
+        for line in lines:
+            line = line.rstrip("\r\n")
+            self.write(f"{tag}{line}")
+        if include_status:
+            self.write(f"{tag}{self.generate_process_output_status(output)}")
+        self.flush()
+
+    def print_raw_output(self, output: ProcessOutput) -> None:
+        """Copy the output of a process that hasn't been read yet straight to stdout, as it is"""
+        # Anything already buffered has to be written first, so it comes before the output
+        self.flush()
+        try:
+            fd = sys.stdout.fileno()
+        except (AttributeError, OSError):
+            sys.stdout.buffer.write(output.process.read())
+            sys.stdout.flush()
+        else:
+            output.process.copy_to(fd)
 
     def print_progress_group_output(
         self,
         output: ProcessGroupOutput,
         interrupt_count: int = 0,
         tail_output: bool = True,
+        eta: tuple[float | None, float | None] = (None, None),
     ) -> None:
         for include_prefix, line, end in self.generate_process_group_output(
-            output, interrupt_count, tail_output
+            output, interrupt_count, tail_output, eta
         ):
             self.write(line, include_prefix, end, truncate=tail_output)
 
+        self.flush()
+
+    def render_progress_group_output(
+        self,
+        output: ProcessGroupOutput,
+        interrupt_count: int = 0,
+        eta: tuple[float | None, float | None] = (None, None),
+        flush: bool = True,
+    ) -> None:
+        """Redraw the output of a process group in place of the last one rendered, only rewriting
+        the lines that have changed since then (usually just the spinners and timers)
+
+        When flush is False the frame is only buffered and is written by the next flush
+        """
+        self._printed.clear()
+        screen = [
+            self.format(line, include_prefix, truncate=True)
+            for include_prefix, line, _ in self.generate_process_group_output(
+                output, interrupt_count, True, eta
+            )
+        ]
+
+        if screen == self._screen:
+            return
+
+        if self._screen:
+            self._buffer.append(constants.UP_LINES.format(len(self._screen)))
+
+        # Lines that haven't changed are stepped over rather than written again
+        unchanged = 0
+        for i, line in enumerate(screen):
+            if i < len(self._screen) and self._screen[i] == line:
+                unchanged += 1
+                continue
+
+            if unchanged:
+                self._buffer.append(constants.DOWN_LINES.format(unchanged))
+                unchanged = 0
+            self._buffer.append(f"{constants.CLEAR_LINE}{line}\n")
+
+        if unchanged:
+            self._buffer.append(constants.DOWN_LINES.format(unchanged))
+        if len(screen) < len(self._screen):
+            self._buffer.append(constants.CLEAR_DOWN)
+
+        self._screen = screen
+        if flush:
+            self.flush()
+
     def clear_printed_lines(self) -> None:
-        # Clear all the lines that were just printed
-        for _, _, end in self._printed:
-            if end == "\n":
-                self.write(
-                    f"{constants.CLEAR_LINE}{constants.UP_LINE}{constants.CLEAR_LINE}",
-                    end="",
-                )
+        # Clear all the lines that were just printed, this is written along with whatever is printed next
+        lines = sum(1 for _, _, end in self._printed if end == "\n")
+        if lines:
+            self.write(
+                f"{constants.UP_LINES.format(lines)}{constants.CLEAR_DOWN}", end=""
+            )
 
         self.reset()
 
     def reset(self) -> None:
         self._printed.clear()
+        self._screen.clear()
+
+
+def process_tag(process: Process) -> str:
+    return process.name or process.command
+
+
+def tag_width(output: ProcessGroupOutput) -> int:
+    """Return how wide the tags of the processes in a process group are, so their output lines up"""
+    return min(
+        max((len(process_tag(p.process)) for p in output.processes), default=0),
+        constants.MAX_TAG_WIDTH,
+    )
 
 
 def set_process_lines(
@@ -258,8 +479,12 @@ def set_process_lines(
     if interrupt_count:
         lines -= 2
 
+    # There isn't a line for every process, so only show the output of the processes that are running
+    if len(output.processes) > lines:
+        set_collapsed_process_lines(output, lines)
+        return
+
     # Allocate lines to processes that have a fixed percentage of lines set
-    allocated_process_lines = lines // len(output.processes)
     processes_with_dynamic_lines: list[ProcessOutput] = []
     used_lines = 0
     for process_output in output.processes:
@@ -274,75 +499,158 @@ def set_process_lines(
         used_lines += process_output.process.lines
 
     # Remove the used lines from the total available lines
-    lines -= used_lines
-
-    while lines:
-        # Calculate how many lines each process should have based on how many processes and lines are left
-        num_processes = len(processes_with_dynamic_lines) or 1
-        allocated_process_lines = lines // num_processes
-        processes_with_excess_output: list[ProcessOutput] = []
-        recalculate_lines = False
-        for process_output in processes_with_dynamic_lines:
-            # If the number of lines in this process output is less than how many terminal lines we would allocate it,
-            # Set it's allocated terminal lines to the exact number of lines in its output and remove this number from
-            # the total available terminal lines
-            if process_output.lines < allocated_process_lines:
-                process_output.process.lines = process_output.lines
-                lines -= process_output.process.lines
-                recalculate_lines = True
-                continue
+    lines = share_lines(processes_with_dynamic_lines, lines - used_lines)
 
-            processes_with_excess_output.append(process_output)
+    # If there is any lines left, allocate them to the process that currently contains the most lines in its output, or
+    # allocate them to the first process if no process contains enough lines
+    if lines:
+        process_with_most_lines = max(
+            output.processes, key=lambda process_output: process_output.process.lines
+        )
+        process_with_most_lines.process.lines += lines
+
+
+def share_lines(process_outputs: Sequence[ProcessOutput], lines: int) -> int:
+    """Share lines between processes, returning how many lines are left over
+
+    Processes with less output than an equal share of the lines are given exactly the lines they need,
+    and the lines they don't need are shared equally between the processes with more output
+    """
+    # Going from the process with the least output to the most, the equal share only grows as
+    # processes are given less than it, so each process only needs to be looked at once
+    process_outputs = sorted(
+        process_outputs, key=lambda process_output: process_output.lines
+    )
+    for i, process_output in enumerate(process_outputs):
+        allocated_process_lines = lines // (len(process_outputs) - i)
+        if process_output.lines < allocated_process_lines:
+            process_output.process.lines = process_output.lines
+            lines -= process_output.lines
+            continue
+
+        # All remaining processes have at least an equal share of output, so they get an equal share
+        for process_output in process_outputs[i:]:
+            process_output.process.lines = allocated_process_lines
+            lines -= allocated_process_lines
+        break
+
+    return lines
 
-        # We need to re-calcuate how many terminal lines we can allocate to each process if the output of at least one process
-        # contains less lines than what we would normally allocate it. This is done so we can allocate these extra lines to the
-        # other processes that contain more lines of output.
-        if recalculate_lines:
-            processes_with_dynamic_lines = processes_with_excess_output
+
+def set_collapsed_process_lines(output: ProcessGroupOutput, lines: int) -> None:
+    """Allocate lines when there are more processes than lines
+
+    Only processes that failed, are running or have just finished are given lines for their output, starting
+    with the processes that failed and then those that most recently produced output. The other processes
+    only get a line for their status, starting from the first queued process so the list scrolls as processes
+    finish, and processes that there isn't room for aren't shown at all
+    """
+    now = time.perf_counter()
+    active: list[ProcessOutput] = []
+    inactive: list[ProcessOutput] = []
+    for process_output in output.processes:
+        process = process_output.process
+        process.lines = 0
+        if (process.return_code() or 0) > 0 or (
+            process.start
+            and (not process.end or now - process.end < constants.RECENTLY_ACTIVE)
+        ):
+            active.append(process_output)
         else:
-            # All remaining processes exceed the number of terminal lines we will allocate them, so allocate them
-            # their terminal lines as normal and break out of the while loop
-            for process_output in processes_with_excess_output:
-                process_output.process.lines = allocated_process_lines
-                lines -= allocated_process_lines
-
-            # If there is any lines left, allocate them to the process that currently contains the most lines in its output, or
-            # allocate them to the first process if no process contains enough lines
-            if lines:
-                process_with_most_lines: ProcessOutput | None = None
-                most_lines = 0
-                for process_output in output.processes:
-                    if process_output.process.lines > most_lines:
-                        process_with_most_lines = process_output
-                        most_lines = process_output.process.lines
-
-                if not process_with_most_lines:
-                    output.processes[0].process.lines += lines
-                else:
-                    process_with_most_lines.process.lines += lines
+            inactive.append(process_output)
 
-            break
+    active.sort(
+        key=lambda process_output: (
+            not process_output.process.return_code(),
+            -process_output.last_output,
+        )
+    )
+
+    # Every active process that fits gets a status line first, then up to half of the lines left are used
+    # for the status lines of the other processes and the rest are shared between the active processes
+    active = active[:lines]
+    lines -= len(active)
+    shown = min(len(inactive), lines // 2)
+    lines -= shown
+
+    if active:
+        for process_output in active:
+            process_output.process.lines = 0
+        lines = share_lines(active, lines + len(active))
+
+    # Lines the active processes don't need are used to show more status lines
+    extra = min(len(inactive) - shown, lines)
+    shown += extra
+    lines -= extra
+
+    start = next(
+        (
+            i
+            for i, process_output in enumerate(inactive)
+            if process_output.process.queued
+        ),
+        len(inactive),
+    )
+    start = max(min(start, len(inactive) - shown), 0)
+    for process_output in inactive[start : start + shown]:
+        process_output.process.lines = 1
+
+    if active and lines:
+        process_with_most_lines = max(
+            active, key=lambda process_output: process_output.process.lines
+        )
+        process_with_most_lines.process.lines += lines
+
+
+@lru_cache(maxsize=4096)
+def measure_line(line: str) -> tuple[str, int]:
+    """Return a line without its ANSI escape sequences and how many columns it takes up in the terminal
+
+    Wide characters (such as CJK characters) take up two columns and combining characters take up none,
+    the result is cached as the same lines are measured on every frame
+    """
+    if "\x1b" in line or "\x9b" in line:
+        line = constants.ANSI_ESCAPE.sub("", line)
+
+    if line.isascii():
+        return line, len(line)
+
+    return line, sum(char_width(char) for char in line)
+
+
+def char_width(char: str) -> int:
+    if unicodedata.combining(char):
+        return 0
+    if unicodedata.east_asian_width(char) in ("W", "F"):
+        return 2
+    return 1
 
 
 def get_num_lines(line: str, columns: int | None = None) -> int:
-    lines = 0
     columns = columns or constants.COLUMNS()
-    line = constants.ANSI_ESCAPE.sub("", line)
-    length = len(line)
-    line_lines = 1
-    if length > columns:
-        line_lines = length // columns
-        remainder = length % columns
-        if remainder:
-            line_lines += 1
-    lines += 1 * line_lines
+    _, width = measure_line(line)
+    if width <= columns:
+        return 1
+
+    lines = width // columns
+    if width % columns:
+        lines += 1
     return lines
 
 
 def truncate_line(line: str, columns: int | None = None) -> str:
     columns = columns or constants.COLUMNS()
-    escaped_line = constants.ANSI_ESCAPE.sub("", line)
-    return "".join(escaped_line[:columns]) + "..."
+    escaped_line, width = measure_line(line)
+    if width == len(escaped_line):
+        return escaped_line[:columns] + "..."
+
+    # Cut the line at the last character that fits within the columns
+    used = 0
+    for i, char in enumerate(escaped_line):
+        used += char_width(char)
+        if used > columns:
+            return escaped_line[:i] + "..."
+    return escaped_line + "..."
 
 
 def format_time_taken(time_taken: float) -> str:
@@ -1,68 +1,405 @@
 from __future__ import annotations
 
+import errno
+import os
+import shlex
+import shutil
 import signal
 import subprocess
-import tempfile
 import time
-from typing import BinaryIO
+from array import array
+from bisect import bisect_right
+from typing import TYPE_CHECKING
 
-from pyallel.errors import InvalidLinesModifierError
+from pyallel.capture import CAPTURES, Capture, PipeCapture
+from pyallel.errors import (
+    InvalidAfterModifierError,
+    InvalidEnvModifierError,
+    InvalidInputsModifierError,
+    InvalidLinesModifierError,
+    InvalidNameModifierError,
+    InvalidShellModifierError,
+)
+
+if TYPE_CHECKING:
+    from pyallel.pool import ShellJob, ShellPool
+
+# Characters that only mean something to a shell, commands containing them are run in a shell
+SHELL_CHARACTERS = frozenset("|&;<>()$`\\*?[]{}#~!\n")
+# Words a shell treats differently at the start of a command than a program of the same name would
+SHELL_WORDS = frozenset(
+    """
+    ! . : [[ alias bg break case cd command continue declare do done elif else esac eval exec exit
+    export fg fi for function getopts hash if jobs let local read readonly return select set shift
+    source then time times trap type typeset ulimit umask unalias unset until wait while
+    """.split()
+)
+
+
+def split_command(command: str) -> list[str] | None:
+    """Split a command into the arguments to run it with directly, without a shell
+
+    Returns None if the command uses anything a shell would interpret differently (such as pipes,
+    variables, globs, environment variable assignments and builtins) or its program can't be found
+    """
+    if not SHELL_CHARACTERS.isdisjoint(command):
+        return None
+
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+
+    if not argv or argv[0] in SHELL_WORDS or "=" in argv[0]:
+        return None
+
+    executable = shutil.which(argv[0])
+    if executable is None:
+        return None
+
+    return [executable, *argv[1:]]
 
 
 class ProcessOutput:
-    def __init__(self, id: int, process: Process, data: str = "") -> None:
+    def __init__(
+        self, id: int, process: Process, data: str = "", scrollback: int = 0
+    ) -> None:
         self.id = id
-        self.data = data
-        self.lines = len(data.splitlines()) + 1
         self.process = process
+        # The number of most recent lines to keep in memory (0 keeps everything), older lines can
+        # be read back from the process's capture using `full`
+        self.scrollback = scrollback
+        # Output is kept as the chunks it was read in, along with the offset each chunk and each line starts at,
+        # so new output never requires copying or re-splitting what came before it
+        self._chunks: list[str] = []
+        self._chunk_offsets = array("q")
+        self._line_offsets = array("q", [0])
+        self._dropped_lines = 0
+        self._size = 0
+        # When output was last appended
+        self.last_output = 0.0
+        self.append(data)
+
+    @property
+    def data(self) -> str:
+        return "".join(self._chunks)
+
+    @property
+    def size(self) -> int:
+        """The number of characters of output that have been appended"""
+        return self._size
+
+    @property
+    def lines(self) -> int:
+        # The number of lines of output plus one for the command status line
+        return self._dropped_lines + self._kept_lines() + 1
+
+    def _kept_lines(self) -> int:
+        lines = len(self._line_offsets)
+        if self._line_offsets[-1] == self._size:
+            lines -= 1
+        return lines
+
+    def append(self, data: str) -> None:
+        if not data:
+            return
+
+        self.last_output = time.perf_counter()
+        self._chunks.append(data)
+        self._chunk_offsets.append(self._size)
+
+        pos = data.find("\n")
+        while pos != -1:
+            self._line_offsets.append(self._size + pos + 1)
+            pos = data.find("\n", pos + 1)
+
+        self._size += len(data)
+
+        # Let the buffer grow to twice its size before dropping old lines, so it isn't trimmed on every append
+        if self.scrollback and len(self._line_offsets) > self.scrollback * 2:
+            self._trim()
+
+    def _trim(self) -> None:
+        # Keep the offset of the last (possibly still empty) line on top of the scrollback lines
+        drop = len(self._line_offsets) - self.scrollback - 1
+        start = self._line_offsets[drop]
+        chunk = bisect_right(self._chunk_offsets, start) - 1
+
+        del self._chunks[:chunk]
+        del self._chunk_offsets[:chunk]
+        cut = start - self._chunk_offsets[0]
+        if cut:
+            self._chunks[0] = self._chunks[0][cut:]
+            self._chunk_offsets[0] = start
+
+        del self._line_offsets[:drop]
+        self._dropped_lines += drop
+
+    def tail(self, lines: int) -> list[str]:
+        """Return the last `lines` lines of output, only looking at the chunks that contain them"""
+        if lines <= 0:
+            return []
+
+        start = self._line_offsets[max(self._kept_lines() - lines, 0)]
+        chunk = bisect_right(self._chunk_offsets, start) - 1
+        if chunk < 0:
+            return []
+
+        data = "".join(self._chunks[chunk:])[start - self._chunk_offsets[chunk] :]
+        return data.splitlines(keepends=True)[-lines:]
+
+    def full(self) -> str:
+        """Return all output, reading it back from the capture if old lines have been dropped
+
+        If the capture doesn't keep output, only the lines still in memory are returned
+        """
+        if not self._dropped_lines:
+            return self.data
+
+        return self.process.read_all().decode() or self.data
 
     def merge(self, other: ProcessOutput) -> None:
-        self.data += other.data
-        self.lines += len(other.data.splitlines())
+        for chunk in other._chunks:
+            self.append(chunk)
 
 
 class Process:
-    def __init__(self, id: int, command: str, percentage_lines: float = 0.0) -> None:
+    def __init__(
+        self,
+        id: int,
+        command: str,
+        percentage_lines: float = 0.0,
+        name: str = "",
+        after: list[str] | None = None,
+        inputs: list[str] | None = None,
+        env: list[str] | None = None,
+        shell: bool | None = None,
+    ) -> None:
         self.id = id
         self.command = command
         self.start = 0.0
         self.end = 0.0
         self.lines = 0
         self.percentage_lines = percentage_lines
-        self._fd: BinaryIO
-        self._process: subprocess.Popen[bytes]
+        self.name = name
+        # The names of the commands that must succeed before this process is started
+        self.after = after or []
+        # The processes that must succeed before this process is started, resolved from
+        # `after` (or the previous process group) by the process group manager
+        self.dependencies: list[Process] = []
+        # The glob patterns of the files this command reads and the names of the environment variables
+        # it uses, its output is cached and replayed while none of them change (when inputs are given)
+        self.inputs = inputs or []
+        self.env = env or []
+        # Whether to run the command in a shell, None only uses a shell if the command needs one
+        self.shell = shell
+        # Set when the output of this process was replayed from the cache instead of running its command
+        self.cached = False
+        # How long this process is expected to take in seconds, from the history of previous runs
+        self.estimate: float | None = None
+        # Set by an engine watching this process, which records its exit code as soon as it exits
+        self.watched = False
+        # Set when this process will never be run, for example when it was queued when interrupted
+        self.skipped = False
+        self._capture: Capture = PipeCapture()
+        # The exit code of a process that wasn't run by `run`, see `finish`
+        self._returncode: int | None = None
+        self._pipe = -1
+        self._pidfd = -1
+        self._process: subprocess.Popen[bytes] | ShellJob
+
+    def argv(self) -> list[str] | None:
+        """Return the arguments to run the command with directly, or None if it must be run in a shell"""
+        if self.shell:
+            return None
+
+        if self.shell is None:
+            return split_command(self.command)
 
-    def run(self) -> None:
+        argv = shlex.split(self.command)
+        return [shutil.which(argv[0]) or argv[0], *argv[1:]]
+
+    def run(self, capture: str = "file", pool: ShellPool | None = None) -> None:
         self.start = time.perf_counter()
-        fd, fd_name = tempfile.mkstemp()
-        self._fd = open(fd_name, "rb")
-        self._process = subprocess.Popen(
-            self.command,
+        self._capture = CAPTURES[capture]()
+        argv = self.argv()
+
+        # The process writes to a pipe rather than straight to the capture file so we can wait on it
+        # with `selectors`, the output is then moved into the capture by `drain`
+        self._pipe, write_pipe = os.pipe()
+        os.set_blocking(self._pipe, False)
+
+        # A command that needs a shell can be run by an idle shell worker instead of starting a new shell,
+        # which then owns the write end of the pipe. The worker reports when the command exits on its
+        # stdout, which is waited on like a pidfd
+        if argv is None and pool is not None:
+            job = pool.run(self.command, write_pipe)
+            if job is not None:
+                self._process = job
+                self._pidfd = os.dup(job.fileno())
+                return
+
+        try:
+            try:
+                self._process = self._popen(argv, write_pipe)
+            except OSError as e:
+                if argv is None or e.errno != errno.ENOEXEC or self.shell is not None:
+                    raise
+
+                # A shell runs an executable file without a #! line as a shell script, so do the same
+                # unless the command was explicitly run without a shell
+                argv = None
+                self._process = self._popen(argv, write_pipe)
+        except OSError as e:
+            if argv is None:
+                raise
+
+            # Report a program that can't be run the way a shell would
+            os.write(write_pipe, f"pyallel: {argv[0]}: {e.strerror}\n".encode())
+            self.finish(127 if isinstance(e, FileNotFoundError) else 126)
+            return
+        finally:
+            os.close(write_pipe)
+
+        # A pidfd becomes readable once the process exits, so exits can be waited on with `selectors` as well.
+        # It requires Python 3.9+ and Linux 5.3+, otherwise exits are found by polling after a SIGCHLD
+        if hasattr(os, "pidfd_open"):
+            try:
+                self._pidfd = os.pidfd_open(self._process.pid)
+            except OSError:
+                pass
+
+    def _popen(self, argv: list[str] | None, stdout: int) -> subprocess.Popen[bytes]:
+        # Running a command directly saves starting a shell just to run it. Fds are still closed in
+        # the child, pyallel's own aren't inheritable but the ones it was started with may be
+        return subprocess.Popen(
+            argv or self.command,
             stdin=subprocess.DEVNULL,
-            stdout=fd,
+            stdout=stdout,
             stderr=subprocess.STDOUT,
-            shell=True,
+            shell=argv is None,
         )
 
+    def replay(self, output: bytes, capture: str = "file") -> None:
+        """Finish straight away with the output of a previous successful run of the command"""
+        self.start = time.perf_counter()
+        self._capture = CAPTURES[capture]()
+        self._capture.write(output)
+        self.cached = True
+        self.finish(0)
+
+    def finish(self, returncode: int) -> None:
+        """Record the exit code of a process that was run (or replayed) without using `run`"""
+        self._returncode = returncode
+        self.end = time.perf_counter()
+
     def __del__(self) -> None:
+        for fd in (self._pipe, self._pidfd):
+            if fd >= 0:
+                os.close(fd)
+
         try:
-            self._fd.close()
+            self._capture.close()
         except AttributeError:
             pass
 
+    def fileno(self) -> int:
+        return self._pipe
+
+    def exit_fileno(self) -> int:
+        return self._pidfd
+
+    def drain(self) -> bool:
+        """Move any output waiting in the stdout pipe into the capture
+
+        Returns False once the pipe has been closed by the process
+        """
+        if self._pipe < 0:
+            return False
+
+        while True:
+            try:
+                data = os.read(self._pipe, 65536)
+            except BlockingIOError:
+                return True
+
+            if not data:
+                os.close(self._pipe)
+                self._pipe = -1
+                return False
+
+            self._capture.write(data)
+
+    @property
+    def queued(self) -> bool:
+        return not self.start and not self.skipped
+
+    def skip(self) -> None:
+        if not self.start:
+            self.skipped = True
+
+    def remaining(self) -> float | None:
+        """Return how many more seconds this process is expected to take, or None if there is no estimate"""
+        if self.end or self.skipped:
+            return 0.0
+
+        if self.estimate is None:
+            return None
+
+        if not self.start:
+            return self.estimate
+
+        return max(self.estimate - (time.perf_counter() - self.start), 0.0)
+
     def poll(self) -> int | None:
+        if not self.start or self.end or self.watched:
+            return self.return_code()
+
+        return self.reap()
+
+    def reap(self) -> int | None:
+        """Check if the process has exited, recording its exit code and end time when it has"""
+        if self.end:
+            return self.return_code()
+
         poll = self._process.poll()
-        if poll is not None and not self.end:
-            self.end = time.perf_counter()
+        if poll is not None:
+            self._exited()
         return poll
 
     def read(self) -> bytes:
-        return self._fd.read()
+        self.drain()
+        return self._capture.read()
+
+    def read_all(self) -> bytes:
+        """Read all output that has been read so far from the start of the capture"""
+        return self._capture.read_all()
+
+    def contents(self) -> bytes | None:
+        """Read all output from the start of the capture, including output that hasn't been read yet,
+        or None if the capture doesn't keep output
+        """
+        self.drain()
+        return self._capture.contents()
+
+    def copy_to(self, fd: int) -> int:
+        """Write all output written since the last read to a file descriptor without decoding it,
+        returning the number of bytes written
+        """
+        self.drain()
+        return self._capture.copy_to(fd)
 
     def readline(self) -> bytes:
-        return self._fd.readline()
+        self.drain()
+        return self._capture.readline()
 
     def return_code(self) -> int | None:
+        if not self.start:
+            return None
+        if self._returncode is not None:
+            return self._returncode
+        if not hasattr(self, "_process"):
+            return None
         return self._process.returncode
 
     def interrupt(self) -> None:
@@ -74,7 +411,19 @@ class Process:
             self._process.send_signal(signal.SIGKILL)
 
     def wait(self) -> int:
-        return self._process.wait()
+        if self._returncode is not None:
+            return self._returncode
+        returncode = self._process.wait()
+        if not self.end:
+            self._exited()
+        return returncode
+
+    def _exited(self) -> None:
+        # Record when the process exited, this only happens once as the exit code is cached from then on
+        self.end = time.perf_counter()
+        if self._pidfd >= 0:
+            os.close(self._pidfd)
+            self._pidfd = -1
 
     @classmethod
     def from_command(cls, id: int, command: str) -> Process:
@@ -85,9 +434,14 @@ class Process:
         args, *parts = cmd
 
         percentage_lines = 0
+        name = ""
+        after: list[str] = []
+        inputs: list[str] = []
+        env: list[str] = []
+        shell: bool | None = None
         for arg in args.split(" "):
             try:
-                arg, value = args.split("=")
+                arg, value = arg.split("=")
             except ValueError:
                 continue
 
@@ -103,7 +457,56 @@ class Process:
                     raise InvalidLinesModifierError(
                         "lines modifier must be a number between 1 and 100"
                     )
+            elif arg == "name":
+                if not value or "," in value:
+                    raise InvalidNameModifierError(
+                        "name modifier must be a name that doesn't contain commas"
+                    )
 
-                break
+                name = value
+            elif arg == "after":
+                after = value.split(",")
+                if not all(after):
+                    raise InvalidAfterModifierError(
+                        "after modifier must be a comma separated list of command names"
+                    )
+            elif arg == "inputs":
+                inputs = value.split(",")
+                if not all(inputs):
+                    raise InvalidInputsModifierError(
+                        "inputs modifier must be a comma separated list of file paths or glob patterns"
+                    )
+            elif arg == "env":
+                env = value.split(",")
+                if not all(env):
+                    raise InvalidEnvModifierError(
+                        "env modifier must be a comma separated list of environment variable names"
+                    )
+            elif arg == "shell":
+                if value not in ("yes", "no"):
+                    raise InvalidShellModifierError("shell modifier must be yes or no")
 
-        return cls(id, " ".join(parts), round(percentage_lines / 100, 2))
+                shell = value == "yes"
+
+        command = " ".join(parts)
+        if shell is False:
+            try:
+                argv = shlex.split(command)
+            except ValueError:
+                argv = []
+
+            if not argv:
+                raise InvalidShellModifierError(
+                    "shell modifier can only be no for a command that can be split into arguments"
+                )
+
+        return cls(
+            id,
+            command,
+            round(percentage_lines / 100, 2),
+            name=name,
+            after=after,
+            inputs=inputs,
+            env=env,
+            shell=shell,
+        )
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import queue
+import signal
+import threading
+from typing import IO, Any, Iterable, Iterator
+
+from pyallel.cache import Cache
+from pyallel.engine import Engine
+from pyallel.history import History
+from pyallel.pool import ShellPool
+from pyallel.process import Process
+from pyallel.process_group import ProcessGroup
+from pyallel.scheduler import Scheduler
+
+
+def read_commands(file: IO[str]) -> Iterator[str]:
+    """Yield the commands in a file one line at a time, skipping blank lines"""
+    for line in file:
+        command = line.rstrip("\r\n")
+        if command.strip():
+            yield command
+
+
+class ProcessFeed:
+    """Runs commands taken lazily from an iterable, like xargs or GNU parallel, so any number of commands
+    can be run without holding them all in memory
+
+    A `Process` is only created for a command once a job slot is free for it, and a process is
+    forgotten once it has been returned by `update`, so no more than `jobs` processes exist at once.
+    Commands don't depend on each other and every command is run even if others fail
+
+    Commands are taken from the iterable by a thread, which reads at most `jobs` commands ahead, so
+    waiting for the iterable to produce a command (e.g. for a line to be written to stdin) never
+    holds up the processes that are already running
+    """
+
+    def __init__(
+        self,
+        commands: Iterable[str],
+        capture: str = "file",
+        jobs: int = 1,
+        history: History | None = None,
+        cache: Cache | None = None,
+        pool: ShellPool | None = None,
+    ) -> None:
+        self._exhausted = False
+        self._exit_code = 0
+        self._interrupt_count = 0
+        self._next_id = 1
+        self._running: list[Process] = []
+        self._engine = Engine()
+        # Without a limit every command would be taken straight away
+        self._scheduler = Scheduler(
+            self._engine, max(jobs, 1), capture, history, cache, pool
+        )
+        # Commands read by the thread, followed by None once the iterable is exhausted
+        self._commands: queue.Queue[str | None] = queue.Queue(max(jobs, 1))
+        self._error: BaseException | None = None
+        threading.Thread(target=self._read, args=(commands,), daemon=True).start()
+
+    def _read(self, commands: Iterable[str]) -> None:
+        try:
+            for command in commands:
+                self._commands.put(command)
+                self._engine.wakeup()
+        except BaseException as e:
+            # Raised from `update` instead, where it would have been if the iterable was read there
+            self._error = e
+        finally:
+            self._commands.put(None)
+            self._engine.wakeup()
+
+    def update(self) -> list[Process]:
+        """Start processes for as many commands as there are free job slots, returning the processes
+        that have finished since the last update in the order they finished
+        """
+        self._engine.reap()
+        self._scheduler.schedule()
+        while self._scheduler.idle() and not self._exhausted:
+            try:
+                command = self._commands.get_nowait()
+            except queue.Empty:
+                break
+
+            if command is None:
+                self._exhausted = True
+                if self._error is not None:
+                    raise self._error
+                break
+
+            process = Process.from_command(self._next_id, command)
+            self._next_id += 1
+            self._scheduler.add(ProcessGroup(id=process.id, processes=[process]))
+            self._scheduler.schedule()
+            self._running.append(process)
+
+        finished = [p for p in self._running if p.return_code() is not None]
+        if not finished:
+            return []
+
+        self._running = [p for p in self._running if p.return_code() is None]
+        for process in finished:
+            if process.return_code():
+                self._exit_code = self._exit_code or 1
+        return sorted(finished, key=lambda process: process.end)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until a process produces output, a process exits, a command is read or a signal is received
+
+        Returns True if any process produced output
+        """
+        return bool(self._engine.wait(timeout))
+
+    def poll(self) -> int | None:
+        """Return the exit code once every command has been run and returned by `update`, otherwise None"""
+        if self._interrupt_count > 1:
+            return self._exit_code
+
+        if self._running or not self._exhausted:
+            return None
+
+        return self._exit_code
+
+    def handle_signal(self, signum: int, _frame: Any) -> None:
+        # Stop taking commands, the first signal lets the running processes finish and the second kills them
+        for process in self._running:
+            if self._interrupt_count == 0:
+                process.interrupt()
+            else:
+                process.kill()
+
+        self._exhausted = True
+        self._exit_code = 128 + signum
+        self._interrupt_count += 1
+        self._engine.wakeup()
+
+    @classmethod
+    def from_commands(
+        cls,
+        commands: Iterable[str],
+        capture: str = "file",
+        jobs: int = 1,
+        history: History | None = None,
+        cache: Cache | None = None,
+        pool: ShellPool | None = None,
+    ) -> ProcessFeed:
+        process_feed = cls(
+            commands,
+            capture=capture,
+            jobs=jobs,
+            history=history,
+            cache=cache,
+            pool=pool,
+        )
+
+        signal.signal(signal.SIGINT, process_feed.handle_signal)
+        signal.signal(signal.SIGTERM, process_feed.handle_signal)
+        process_feed._engine.watch_child_signals()
+
+        return process_feed
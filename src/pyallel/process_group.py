@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Sequence
 
 from pyallel.errors import (
+    InvalidJobsModifierError,
     InvalidLinesModifierError,
 )
 from pyallel.process import Process, ProcessOutput
@@ -12,32 +13,38 @@ class ProcessGroupOutput:
     def __init__(self, id: int, processes: Sequence[ProcessOutput]) -> None:
         self.id = id
         self.processes = processes
+        self._index = {output.id: output for output in processes}
 
     def merge(self, other: ProcessGroupOutput) -> None:
-        for i, _ in enumerate(self.processes):
-            self.processes[i].merge(other.processes[i])
+        # Only the outputs of processes that produced new output need to be merged
+        for output in other.processes:
+            if output.size:
+                self._index[output.id].merge(output)
 
 
 class ProcessGroup:
-    def __init__(self, id: int, processes: list[Process]) -> None:
+    def __init__(self, id: int, processes: list[Process], jobs: int = 0) -> None:
         self.id = id
         self.processes = processes
+        # The most processes from this group that can run at once, 0 leaves it up to the scheduler
+        self.jobs = jobs
         self._exit_code: int = 0
         self._interrupt_count: int = 0
-
-    def run(self) -> None:
-        for process in self.processes:
-            process.run()
+        self._running = list(processes)
 
     def poll(self) -> int | None:
-        polls: list[int | None] = [process.poll() for process in self.processes]
+        # Only poll the processes that were still queued or running last time, as the exit codes of the others are already known
+        self._running = [p for p in self._running if p.poll() is None and not p.skipped]
 
-        running = [p for p in polls if p is None]
+        polls = [process.return_code() for process in self.processes]
+
+        running = self._running
         failed = [p for p in polls if p is not None and p > 0]
+        skipped = [p for p in self.processes if p.skipped]
 
         if running:
             return None
-        elif failed:
+        elif failed or skipped:
             return 1
         else:
             return 0
@@ -63,7 +70,27 @@ class ProcessGroup:
         self._interrupt_count += 1
 
     @classmethod
-    def from_commands(cls, id: int, process_id: int, *commands: str) -> ProcessGroup:
+    def from_commands(
+        cls, id: int, process_id: int, *commands: str, modifiers: str = ""
+    ) -> ProcessGroup:
+        jobs = 0
+        for modifier in modifiers.split():
+            try:
+                arg, value = modifier.split("=")
+            except ValueError:
+                continue
+
+            if arg == "jobs":
+                try:
+                    jobs = int(value)
+                except ValueError:
+                    jobs = 0
+
+                if jobs < 1:
+                    raise InvalidJobsModifierError(
+                        "jobs modifier must be a number greater than 0"
+                    )
+
         processes: list[Process] = []
 
         percentage_lines_sum = 0.0
@@ -77,6 +104,6 @@ class ProcessGroup:
                 "lines modifier must not exceed 100 across all processes within each process group"
             )
 
-        process_group = cls(id=id, processes=processes)
+        process_group = cls(id=id, processes=processes, jobs=jobs)
 
         return process_group
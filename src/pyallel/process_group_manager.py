@@ -3,8 +3,105 @@ from __future__ import annotations
 import signal
 from typing import Any
 
-from pyallel.process import ProcessOutput
+from pyallel.cache import Cache
+from pyallel.engine import Engine
+from pyallel.errors import InvalidAfterModifierError, InvalidNameModifierError
+from pyallel.history import History
+from pyallel.pool import ShellPool
+from pyallel.process import Process, ProcessOutput
 from pyallel.process_group import ProcessGroupOutput, ProcessGroup
+from pyallel.scheduler import Scheduler
+
+
+def link_process_groups(process_groups: list[ProcessGroup]) -> None:
+    """Resolve the dependencies of each process
+
+    A process depends on the commands named by its after modifier, otherwise it depends on
+    every process in the previous process group, so process groups still run in sequence
+    """
+    names: dict[str, Process] = {}
+    for pg in process_groups:
+        for process in pg.processes:
+            if not process.name:
+                continue
+
+            if process.name in names:
+                raise InvalidNameModifierError(
+                    f"name modifier '{process.name}' is used by more than one command"
+                )
+            names[process.name] = process
+
+    previous: list[Process] = []
+    for pg in process_groups:
+        for process in pg.processes:
+            if not process.after:
+                process.dependencies = list(previous)
+                continue
+
+            process.dependencies = []
+            for name in process.after:
+                if name not in names:
+                    raise InvalidAfterModifierError(
+                        f"after modifier refers to unknown command name '{name}'"
+                    )
+                process.dependencies.append(names[name])
+        previous = pg.processes
+
+    # Check for cycles with a depth first search, processes on the current path are "visiting"
+    visited: dict[Process, bool] = {}
+    for pg in process_groups:
+        for process in pg.processes:
+            if process in visited:
+                continue
+
+            stack = [(process, iter(process.dependencies))]
+            visited[process] = False
+            while stack:
+                node, dependencies = stack[-1]
+                for dependency in dependencies:
+                    if dependency not in visited:
+                        visited[dependency] = False
+                        stack.append((dependency, iter(dependency.dependencies)))
+                        break
+
+                    if not visited[dependency]:
+                        raise InvalidAfterModifierError(
+                            f"after modifier creates a dependency cycle with command '{dependency.name or dependency.command}'"
+                        )
+                else:
+                    visited[node] = True
+                    stack.pop()
+
+
+def parse_process_groups(*args: str) -> list[ProcessGroup]:
+    """Create the process groups for a list of commands, group separators and their modifiers"""
+    # Each group separator starts a new process group and can set modifiers for it (e.g. "::: jobs=2"),
+    # a separator before the first command sets the modifiers of the first process group
+    groups: list[tuple[str, list[str]]] = [("", [])]
+    for arg in args:
+        if arg == ":::" or arg.startswith("::: "):
+            modifiers = arg[4:]
+            if len(groups) == 1 and not groups[0][1]:
+                groups[0] = (modifiers, [])
+            else:
+                groups.append((modifiers, []))
+            continue
+
+        groups[-1][1].append(arg)
+
+    process_groups: list[ProcessGroup] = []
+    process_id = 1
+    for modifiers, commands in groups:
+        if not commands:
+            continue
+
+        pg = ProcessGroup.from_commands(
+            len(process_groups) + 1, process_id, *commands, modifiers=modifiers
+        )
+        process_groups.append(pg)
+        process_id += len(pg.processes)
+
+    return process_groups
 
 
 class ProcessGroupManagerOutput:
@@ -26,35 +123,85 @@ class ProcessGroupManagerOutput:
 
 
 class ProcessGroupManager:
-    def __init__(self, process_groups: list[ProcessGroup]) -> None:
+    def __init__(
+        self,
+        process_groups: list[ProcessGroup],
+        scrollback: int = 0,
+        capture: str = "file",
+        jobs: int = 0,
+        history: History | None = None,
+        cache: Cache | None = None,
+        pool: ShellPool | None = None,
+    ) -> None:
         self._exit_code = 0
         self._interrupt_count = 0
         self._cur_process_group: ProcessGroup | None = None
         self._process_groups = process_groups
+        self._processes = [p for pg in process_groups for p in pg.processes]
+        self._engine = Engine()
+        self._scheduler = Scheduler(self._engine, jobs, capture, history, cache, pool)
         self._output = ProcessGroupManagerOutput(
             process_group_outputs={
                 pg.id: ProcessGroupOutput(
                     id=pg.id,
-                    processes=[ProcessOutput(id=p.id, process=p) for p in pg.processes],
+                    processes=[
+                        ProcessOutput(id=p.id, process=p, scrollback=scrollback)
+                        for p in pg.processes
+                    ],
                 )
                 for pg in self._process_groups
             }
         )
+        # The output of each process by its id, for the process groups that haven't been shown yet
+        self._process_outputs = {
+            output.id: output
+            for pg in self._output.process_group_outputs.values()
+            for output in pg.processes
+        }
+        link_process_groups(self._process_groups)
+        for process_group in self._process_groups:
+            self._scheduler.add(process_group)
 
     def run(self) -> None:
-        if self._process_groups:
-            self._cur_process_group = self._process_groups.pop(0)
-            self._cur_process_group.run()
-        else:
-            self._cur_process_group = None
+        """Start any processes that are ready and move on to the next process group to show"""
+        # The output of the previous process group has already been printed and is still
+        # available from each process's capture file, so stop holding onto it in memory
+        if self._cur_process_group:
+            self._drop_output(self._cur_process_group.id)
+
+        self._scheduler.schedule()
+        self._cur_process_group = None
+        while self._process_groups:
+            process_group = self._process_groups.pop(0)
+            # Process groups that will never run because the commands they depend on failed aren't shown
+            if all(process.skipped for process in process_group.processes):
+                self._drop_output(process_group.id)
+                continue
+
+            self._cur_process_group = process_group
+            break
+
+    def _drop_output(self, process_group_id: int) -> None:
+        output = self._output.process_group_outputs.pop(process_group_id, None)
+        if output is not None:
+            for process_output in output.processes:
+                self._process_outputs.pop(process_output.id, None)
 
     def next(self) -> bool:
         return True if self._cur_process_group or self._process_groups else False
 
+    def update(self) -> None:
+        """Record the exits of processes and start queued processes in the job slots that have been freed"""
+        self._engine.reap()
+        self._scheduler.schedule()
+
     def stream(self) -> ProcessGroupManagerOutput:
         if self._cur_process_group is None:
             return ProcessGroupManagerOutput()
 
+        # Record exits before reading, so all output written by processes that have exited is read
+        # and `poll` reports the same state as the output that is returned here
+        self.update()
         output = ProcessGroupManagerOutput(
             cur_process_group_id=self._cur_process_group.id,
             process_group_outputs={
@@ -66,6 +213,25 @@ class ProcessGroupManager:
 
         return output
 
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until a process produces output, a process exits or a signal is received
+
+        Returns True if any process produced output
+        """
+        return bool(self._engine.wait(timeout))
+
+    def eta(self) -> tuple[float | None, float | None]:
+        """Return how many seconds are expected until the current process group and all process groups
+        have finished, each is None if there isn't enough history to know
+        """
+        if self._cur_process_group is None:
+            return None, None
+
+        return (
+            self._scheduler.eta(self._cur_process_group.processes),
+            self._scheduler.eta(self._processes),
+        )
+
     def get_cur_process_group_output(self) -> ProcessGroupOutput:
         if self._cur_process_group:
             return self._output.process_group_outputs[self._cur_process_group.id]
@@ -73,12 +239,10 @@ class ProcessGroupManager:
         raise KeyError("no current process group output")
 
     def get_process(self, id: int) -> ProcessOutput:
-        for pg in self._output.process_group_outputs.values():
-            for process in pg.processes:
-                if process.id == id:
-                    return process
-
-        raise KeyError(f"process with id '{id}' not found")
+        try:
+            return self._process_outputs[id]
+        except KeyError:
+            raise KeyError(f"process with id '{id}' not found")
 
     def poll(self) -> int | None:
         if self._cur_process_group is None:
@@ -98,48 +262,35 @@ class ProcessGroupManager:
         for process_group in self._process_groups:
             process_group.handle_signal(signum)
 
+        self._scheduler.cancel()
         self._exit_code = 128 + signum
         self._interrupt_count += 1
+        self._engine.wakeup()
 
     @classmethod
-    def from_args(cls, *args: str) -> ProcessGroupManager:
-        last_separator_index = 0
-        commands: list[str] = []
-        process_groups: list[ProcessGroup] = []
-        progress_group_id = 1
-        process_id = 1
-
-        for i, arg in enumerate(args):
-            if arg == ":::":
-                if i - 1 == 0:
-                    pg = ProcessGroup.from_commands(
-                        progress_group_id, process_id, args[0]
-                    )
-                else:
-                    pg = ProcessGroup.from_commands(
-                        progress_group_id, process_id, *commands[last_separator_index:]
-                    )
-
-                process_groups.append(pg)
-                process_id += len(pg.processes)
-                last_separator_index = i
-                progress_group_id += 1
-                continue
-
-            commands.append(arg)
-
-        if len(process_groups) > 1:
-            last_separator_index -= 1
-
-        process_groups.append(
-            ProcessGroup.from_commands(
-                progress_group_id, process_id, *commands[last_separator_index:]
-            )
+    def from_args(
+        cls,
+        *args: str,
+        scrollback: int = 0,
+        capture: str = "file",
+        jobs: int = 0,
+        history: History | None = None,
+        cache: Cache | None = None,
+        pool: ShellPool | None = None,
+    ) -> ProcessGroupManager:
+        process_groups = parse_process_groups(*args)
+        process_group_manager = cls(
+            process_groups=process_groups,
+            scrollback=scrollback,
+            capture=capture,
+            jobs=jobs,
+            history=history,
+            cache=cache,
+            pool=pool,
         )
 
-        process_group_manager = cls(process_groups=process_groups)
-
         signal.signal(signal.SIGINT, process_group_manager.handle_signal)
         signal.signal(signal.SIGTERM, process_group_manager.handle_signal)
+        process_group_manager._engine.watch_child_signals()
 
         return process_group_manager
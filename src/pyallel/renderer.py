@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from pyallel import constants
+from pyallel.printer import Printer
+from pyallel.process_group_manager import ProcessGroupManager
+
+
+class Renderer:
+    """Redraws the interactive view of the current process group on its own thread, so a slow terminal
+    never holds up reading the output of processes
+
+    Frames are drawn up to every `MIN_FRAME_INTERVAL` seconds while there is new output, and the time
+    between frames backs off to `IDLE_FRAME_INTERVAL` seconds when only the spinners and timers change
+
+    `lock` must be held while changing the output of the process group manager
+    """
+
+    def __init__(
+        self, process_group_manager: ProcessGroupManager, printer: Printer
+    ) -> None:
+        self.lock = threading.Lock()
+        self._process_group_manager = process_group_manager
+        self._printer = printer
+        self._updated = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._updated.set()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop drawing frames, waiting for the frame being drawn to finish"""
+        self._stopped.set()
+        self._updated.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def update(self) -> None:
+        """Let the renderer know there is something new to show, so the next frame is drawn soon"""
+        self._updated.set()
+
+    def _run(self) -> None:
+        interval = constants.MIN_FRAME_INTERVAL
+        while not self._stopped.is_set():
+            frame_start = time.perf_counter()
+            updated = self._updated.is_set()
+            self._updated.clear()
+            self.render()
+
+            if updated:
+                interval = constants.MIN_FRAME_INTERVAL
+            else:
+                interval = min(interval * 2, constants.IDLE_FRAME_INTERVAL)
+
+            # Always leave the shortest time between frames, then draw the next frame once
+            # there is something new to show or the interval has passed
+            frame_time = time.perf_counter() - frame_start
+            if self._stopped.wait(max(constants.MIN_FRAME_INTERVAL - frame_time, 0)):
+                break
+            self._updated.wait(
+                max(interval - (time.perf_counter() - frame_start), 0)
+            )
+
+    def render(self) -> None:
+        with self.lock:
+            try:
+                output = self._process_group_manager.get_cur_process_group_output()
+            except KeyError:
+                return
+
+            self._printer.render_progress_group_output(
+                output,
+                self._process_group_manager._interrupt_count,
+                eta=self._process_group_manager.eta(),
+                flush=False,
+            )
+
+        # Only write the frame once the lock is released, so writing to a slow terminal doesn't
+        # stop the output of processes from being read
+        self._printer.flush()
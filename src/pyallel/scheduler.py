@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+from collections import Counter
+from typing import Callable
+
+from pyallel.cache import Cache
+from pyallel.engine import Engine
+from pyallel.history import History
+from pyallel.pool import ShellPool
+from pyallel.process import Process
+from pyallel.process_group import ProcessGroup
+
+
+def dependencies_succeeded(process: Process) -> bool | None:
+    """Return True if all the dependencies of a process succeeded, False if one failed or was skipped
+    and None if it still has to wait for one to finish
+
+    Dependencies are checked in order and checking stops at the first one that is still running,
+    so a failure is only noticed once the dependencies before it have finished
+    """
+    for dependency in process.dependencies:
+        if dependency.skipped:
+            return False
+
+        return_code = dependency.return_code()
+        if return_code is None:
+            return None
+
+        if return_code != 0:
+            return False
+
+    return True
+
+
+def critical_paths(
+    processes: list[Process], estimate: Callable[[Process], float]
+) -> dict[Process, float]:
+    """Return the estimated duration of the longest chain of processes starting at each process,
+    following the processes that depend on it
+    """
+    dependents: dict[Process, list[Process]] = {process: [] for process in processes}
+    for process in processes:
+        for dependency in process.dependencies:
+            if dependency in dependents:
+                dependents[dependency].append(process)
+
+    # Work back from the processes nothing depends on, so the paths of all the dependents
+    # of a process are known before its own path is worked out
+    remaining = {process: len(dependents[process]) for process in processes}
+    ready = [process for process in processes if not remaining[process]]
+    paths: dict[Process, float] = {}
+    while ready:
+        process = ready.pop()
+        paths[process] = estimate(process) + max(
+            (paths[dependent] for dependent in dependents[process]), default=0.0
+        )
+        for dependency in process.dependencies:
+            if dependency in remaining:
+                remaining[dependency] -= 1
+                if not remaining[dependency]:
+                    ready.append(dependency)
+
+    return paths
+
+
+def finish_times(processes: list[Process]) -> dict[Process, float] | None:
+    """Return how many seconds from now each process (and the processes it depends on) is expected
+    to finish, assuming no process has to wait for a free job slot
+
+    Returns None if a process that hasn't finished yet has no estimate
+    """
+    times: dict[Process, float] = {}
+    for process in processes:
+        stack = [process]
+        while stack:
+            current = stack[-1]
+            if current in times:
+                stack.pop()
+                continue
+
+            if current.end or current.skipped:
+                times[current] = 0.0
+                stack.pop()
+                continue
+
+            waiting = [
+                dependency
+                for dependency in current.dependencies
+                if dependency not in times
+            ]
+            if waiting:
+                stack.extend(waiting)
+                continue
+
+            remaining = current.remaining()
+            if remaining is None:
+                return None
+
+            times[current] = remaining + max(
+                (times[dependency] for dependency in current.dependencies),
+                default=0.0,
+            )
+            stack.pop()
+
+    return times
+
+
+class Scheduler:
+    """Starts queued processes as job slots become free, so at most `jobs` processes are running at once
+    (0 doesn't limit how many processes can run)
+
+    A process group can also limit how many of its own processes run at once with its `jobs` attribute
+
+    A process is only started once all of its dependencies have succeeded, and is skipped if any of them
+    failed or were skipped
+
+    When given a history of how long commands took, the processes with the longest critical path
+    (the longest chain of durations through the processes that depend on them) are started first,
+    otherwise processes are started in the order they were added
+
+    When given a cache, processes with inputs whose result is in the cache are finished straight away
+    with their cached output instead of being run, and the output of those that succeed is cached
+
+    When given a pool of shell workers, commands that need a shell are run by them
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        jobs: int = 0,
+        capture: str = "file",
+        history: History | None = None,
+        cache: Cache | None = None,
+        pool: ShellPool | None = None,
+    ) -> None:
+        self.jobs = jobs
+        self._engine = engine
+        self._capture = capture
+        self._history = history
+        self._cache = cache
+        self._pool = pool
+        # The cache keys of the running processes that will have their output cached if they succeed
+        self._cache_keys: dict[Process, str] = {}
+        self._queue: list[tuple[ProcessGroup, Process]] = []
+        self._running: list[tuple[ProcessGroup, Process]] = []
+        self._prioritised = True
+
+    def add(self, process_group: ProcessGroup) -> None:
+        for process in process_group.processes:
+            if self._history is not None:
+                process.estimate = self._history.estimate(process.command)
+            self._queue.append((process_group, process))
+        self._prioritised = False
+
+    def _prioritise(self) -> None:
+        self._prioritised = True
+        if self._history is None:
+            return
+
+        paths = critical_paths(
+            [process for _, process in self._queue],
+            lambda process: process.estimate or 0.0,
+        )
+        # Sorting is stable, so processes with the same (or no) history keep their order
+        self._queue.sort(key=lambda item: paths.get(item[1], 0.0), reverse=True)
+
+    def schedule(self) -> list[Process]:
+        """Start as many queued processes as there are free job slots, returning the processes that were started"""
+        running: list[tuple[ProcessGroup, Process]] = []
+        for process_group, process in self._running:
+            if process.poll() is None:
+                running.append((process_group, process))
+                continue
+
+            if self._history is not None and process.return_code() == 0:
+                self._history.record(process.command, process.end - process.start)
+            self._store(process)
+        self._running = running
+
+        if not self._prioritised:
+            self._prioritise()
+        self._skip_failed_dependents()
+        if not self._queue or self._full():
+            return []
+
+        running_in_group = Counter(pg.id for pg, _ in self._running)
+        started: list[Process] = []
+        queue: list[tuple[ProcessGroup, Process]] = []
+        for process_group, process in self._queue:
+            # Checked for each process, as `cancel` can be called by a signal handler part way through
+            if process.skipped:
+                continue
+
+            if (
+                self._full()
+                or (
+                    process_group.jobs
+                    and running_in_group[process_group.id] >= process_group.jobs
+                )
+                or not dependencies_succeeded(process)
+            ):
+                queue.append((process_group, process))
+                continue
+
+            if self._replay(process):
+                started.append(process)
+                continue
+
+            process.run(self._capture, self._pool)
+            self._engine.register(process)
+            self._running.append((process_group, process))
+            running_in_group[process_group.id] += 1
+            started.append(process)
+
+        self._queue = queue
+        return started
+
+    def _replay(self, process: Process) -> bool:
+        """Finish the process with its cached output if its result is in the cache, returning True if it was"""
+        if self._cache is None or not process.inputs:
+            return False
+
+        key = self._cache.key(process.command, process.inputs, process.env)
+        output = self._cache.get(key)
+        if output is None:
+            self._cache_keys[process] = key
+            return False
+
+        process.replay(output, self._capture)
+        # Nothing will be heard from a replayed process, so make sure whoever is waiting looks at it
+        self._engine.wakeup()
+        return True
+
+    def _store(self, process: Process) -> None:
+        key = self._cache_keys.pop(process, None)
+        if self._cache is None or key is None or process.return_code() != 0:
+            return
+
+        output = process.contents()
+        if output is not None:
+            self._cache.put(key, output)
+
+    def _skip_failed_dependents(self) -> None:
+        # Skipping a process can cause the processes that depend on it to be skipped too,
+        # so keep going until nothing else is skipped
+        skipped = True
+        while skipped and self._queue:
+            skipped = False
+            queue: list[tuple[ProcessGroup, Process]] = []
+            for process_group, process in self._queue:
+                if process.skipped:
+                    continue
+
+                if dependencies_succeeded(process) is False:
+                    process.skip()
+                    skipped = True
+                else:
+                    queue.append((process_group, process))
+            self._queue = queue
+
+    def eta(self, processes: list[Process]) -> float | None:
+        """Return how many seconds are expected until all the given processes have finished,
+        or None if there isn't enough history to know
+        """
+        times = finish_times(processes)
+        if times is None:
+            return None
+
+        eta = max((times[process] for process in processes), default=0.0)
+        if self.jobs:
+            # There can't be more work left than can be done with all the job slots in use
+            work = sum(process.remaining() or 0.0 for process in times)
+            eta = max(eta, work / self.jobs)
+
+        return eta
+
+    def idle(self) -> bool:
+        """Return True if nothing is queued and there is a free job slot for another process"""
+        return not self._queue and not self._full()
+
+    def _full(self) -> bool:
+        return bool(self.jobs) and len(self._running) >= self.jobs
+
+    def cancel(self) -> None:
+        """Skip all queued processes so they are never started
+
+        This is called from signal handlers, which can interrupt `schedule`, so the queue isn't changed
+        here and the skipped processes are dropped from it by `schedule` instead
+        """
+        for _, process in self._queue:
+            process.skip()
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+import pytest
+from pytest import MonkeyPatch
+
+
+@pytest.fixture(autouse=True)
+def cache_home(
+    tmp_path_factory: pytest.TempPathFactory, monkeypatch: MonkeyPatch
+) -> None:
+    # Keep the command history written by tests out of the real cache directory
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path_factory.mktemp("cache")))
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import AsyncIterator
+
+from pyallel.aio import (
+    AsyncProcessGroupManager,
+    Event,
+    Exited,
+    Output,
+    Skipped,
+    Started,
+    run,
+)
+
+
+async def collect(events: AsyncIterator[Event]) -> list[Event]:
+    return [event async for event in events]
+
+
+def describe(events: list[Event]) -> list[tuple[str, str, str]]:
+    described: list[tuple[str, str, str]] = []
+    for event in events:
+        if isinstance(event, Output):
+            described.append(("output", event.process.command, event.data))
+        elif isinstance(event, Exited):
+            described.append(("exited", event.process.command, str(event.return_code)))
+        else:
+            described.append((type(event).__name__.lower(), event.process.command, ""))
+    return described
+
+
+def test_run() -> None:
+    events = asyncio.run(collect(run("echo first", ":::", "echo second")))
+    assert describe(events) == [
+        ("started", "echo first", ""),
+        ("output", "echo first", "first\n"),
+        ("exited", "echo first", "0"),
+        ("started", "echo second", ""),
+        ("output", "echo second", "second\n"),
+        ("exited", "echo second", "0"),
+    ]
+
+
+def test_run_script_without_shebang(tmp_path: Path) -> None:
+    script = tmp_path / "script.sh"
+    script.write_text("echo hi\n")
+    script.chmod(0o755)
+
+    events = asyncio.run(collect(run(str(script))))
+    assert describe(events) == [
+        ("started", str(script), ""),
+        ("output", str(script), "hi\n"),
+        ("exited", str(script), "0"),
+    ]
+
+
+def test_run_skips_dependents_of_failed_processes() -> None:
+    manager = AsyncProcessGroupManager.from_args(
+        "name=fail :: exit 2", "echo other", ":::", "after=fail :: echo skipped"
+    )
+    assert manager.exit_code is None
+
+    events = asyncio.run(collect(manager.events()))
+    exited = {e.process.command: e.return_code for e in events if isinstance(e, Exited)}
+    assert exited == {"exit 2": 2, "echo other": 0}
+    assert [e.process.command for e in events if isinstance(e, Skipped)] == [
+        "echo skipped"
+    ]
+    assert manager.exit_code == 1
+
+
+def test_run_limits_running_processes() -> None:
+    events = asyncio.run(collect(run("sleep 0.1", "sleep 0.1", "sleep 0.1", jobs=2)))
+    running = 0
+    most_running = 0
+    for event in events:
+        if isinstance(event, Started):
+            running += 1
+            most_running = max(most_running, running)
+        elif isinstance(event, Exited):
+            running -= 1
+    assert most_running == 2
+
+
+def test_run_does_not_block_the_event_loop() -> None:
+    async def main() -> int:
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.ensure_future(tick())
+        await collect(run("sleep 0.2"))
+        ticker.cancel()
+        return ticks
+
+    assert asyncio.run(main()) > 5
+
+
+def test_stopping_iteration_kills_processes() -> None:
+    manager = AsyncProcessGroupManager.from_args("sleep 10", ":::", "echo never")
+
+    async def main() -> None:
+        async for event in manager.events():
+            if isinstance(event, Started):
+                break
+
+    asyncio.run(main())
+    processes = [p for pg in manager.process_groups for p in pg.processes]
+    assert processes[0].return_code() == -9
+    assert processes[1].skipped
+    assert manager.exit_code == 1
+
+
+def test_closing_events_records_exit_of_killed_processes() -> None:
+    manager = AsyncProcessGroupManager.from_args("sleep 10", "echo fast")
+
+    async def main() -> None:
+        events = manager.events()
+        async for event in events:
+            if isinstance(event, Started):
+                break
+        await events.aclose()  # type: ignore[attr-defined]
+
+    asyncio.run(main())
+    assert manager.exit_code == 1
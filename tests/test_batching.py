@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from pyallel.batching import (
+    MAX_ARG_STRLEN,
+    batch_args,
+    expand_commands,
+    max_command_length,
+    read_args,
+)
+from pyallel.errors import ArgumentTooLongError
+
+
+def test_read_args() -> None:
+    assert read_args(io.StringIO("a.py\n\nb c.py\r\n")) == ["a.py", "b c.py"]
+
+
+def test_max_command_length() -> None:
+    assert 0 < max_command_length() < MAX_ARG_STRLEN
+
+
+def test_batch_args_fills_commands() -> None:
+    assert batch_args(["a", "b", "c"], ["echo {}"]) == [["a", "b", "c"]]
+
+
+def test_batch_args_one_per_command() -> None:
+    assert batch_args(["a", "b", "c"], ["echo {}"], jobs=2, max_args=1) == [
+        ["a"],
+        ["b"],
+        ["c"],
+    ]
+
+
+def test_batch_args_spreads_across_job_slots() -> None:
+    args = [str(i) for i in range(10)]
+    batches = batch_args(args, ["echo {}"], jobs=4, max_args=0)
+    assert [len(batch) for batch in batches] == [3, 3, 2, 2]
+    assert [arg for batch in batches for arg in batch] == args
+
+
+def test_batch_args_limits_args() -> None:
+    args = [str(i) for i in range(10)]
+    batches = batch_args(args, ["echo {}"], jobs=1, max_args=4)
+    assert [len(batch) for batch in batches] == [4, 3, 3]
+
+
+def test_batch_args_limits_chars() -> None:
+    # "echo " plus up to three of "aa" separated by spaces
+    batches = batch_args(["aa"] * 7, ["echo {}"], jobs=1, max_args=0, max_chars=13)
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+
+    # Each placeholder is filled, so the arguments count for each of them
+    batches = batch_args(["aa"] * 4, ["cp {} {}/"], jobs=1, max_args=0, max_chars=17)
+    assert [len(batch) for batch in batches] == [2, 2]
+
+
+def test_batch_args_argument_too_long() -> None:
+    with pytest.raises(ArgumentTooLongError):
+        batch_args(["a" * 20], ["echo {}"], max_chars=10)
+
+
+def test_expand_commands() -> None:
+    assert expand_commands(
+        ["a.py", "it's.py", "c.py"],
+        ["echo start", ":::", "black {}", "lines=50 :: mypy {}"],
+        jobs=2,
+        max_args=0,
+    ) == [
+        "echo start",
+        ":::",
+        "black a.py 'it'\"'\"'s.py'",
+        "black c.py",
+        "lines=50 :: mypy a.py 'it'\"'\"'s.py'",
+        "lines=50 :: mypy c.py",
+    ]
+
+
+def test_expand_commands_without_args() -> None:
+    assert expand_commands([], ["echo start", "black {}"]) == ["echo start"]
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from pytest import MonkeyPatch
+
+from pyallel.cache import Cache, default_path
+
+
+def test_default_path() -> None:
+    assert default_path() == os.path.join(
+        os.environ["XDG_CACHE_HOME"], "pyallel", "results"
+    )
+
+
+def test_put_and_get(tmp_path: Path) -> None:
+    cache = Cache(str(tmp_path / "results"))
+    key = cache.key("make", [], [])
+    assert cache.get(key) is None
+
+    cache.put(key, b"built\n")
+    assert cache.get(key) == b"built\n"
+    assert Cache(str(tmp_path / "results")).get(key) == b"built\n"
+
+
+def test_key_changes_with_command_and_env(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    cache = Cache(str(tmp_path / "results"))
+    monkeypatch.setenv("PYALLEL_TEST", "1")
+    key = cache.key("make", [], ["PYALLEL_TEST"])
+    assert key == cache.key("make", [], ["PYALLEL_TEST"])
+    assert key != cache.key("make test", [], ["PYALLEL_TEST"])
+
+    monkeypatch.setenv("PYALLEL_TEST", "2")
+    assert key != cache.key("make", [], ["PYALLEL_TEST"])
+    monkeypatch.delenv("PYALLEL_TEST")
+    assert key != cache.key("make", [], ["PYALLEL_TEST"])
+
+
+def test_key_changes_with_inputs(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("a = 1\n")
+    cache = Cache(str(tmp_path / "results"))
+    key = cache.key("mypy .", ["src/**/*.py"], [])
+    assert key == Cache(str(tmp_path / "results")).key("mypy .", ["src/**/*.py"], [])
+
+    (tmp_path / "src" / "a.py").write_text("a = 2\n")
+    changed = cache.key("mypy .", ["src/**/*.py"], [])
+    assert changed != key
+
+    (tmp_path / "src" / "b.py").write_text("")
+    assert cache.key("mypy .", ["src/**/*.py"], []) != changed
+
+
+def test_unchanged_files_are_not_hashed_again(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.py").write_text("a = 1\n")
+    cache = Cache(str(tmp_path / "results"))
+    key = cache.key("mypy .", ["a.py"], [])
+
+    # Pretend the file had different contents when it was last hashed
+    digests = cache._load_digests()
+    digests[str(tmp_path / "a.py")][2] = "stale"
+    assert cache.key("mypy .", ["a.py"], []) != key
+
+
+def test_least_recently_used_results_are_evicted(tmp_path: Path) -> None:
+    cache = Cache(str(tmp_path / "results"), max_size=10)
+    cache.put("first", b"12345")
+    cache.put("second", b"12345")
+    os.utime(tmp_path / "results" / "first", (0, 0))
+    os.utime(tmp_path / "results" / "second", (1, 1))
+    assert cache.get("first") == b"12345"
+
+    cache.put("third", b"12345")
+    assert cache.get("first") == b"12345"
+    assert cache.get("second") is None
+    assert cache.get("third") == b"12345"
+
+
+def test_unwritable_cache(tmp_path: Path) -> None:
+    path = tmp_path / "file"
+    path.write_text("")
+    cache = Cache(str(path / "results"))
+    cache.put(cache.key("make", [], []), b"built\n")
+    assert cache.get(cache.key("make", [], [])) is None
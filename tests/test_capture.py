@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from pyallel.capture import CAPTURES, FileCapture
+from pyallel.process import Process
+
+
+@pytest.mark.parametrize("capture", CAPTURES)
+def test_read(capture: str) -> None:
+    cap = CAPTURES[capture]()
+    cap.write(b"first\nsec")
+    assert cap.read() == b"first\nsec"
+    assert cap.read() == b""
+    cap.write(b"ond\n")
+    assert cap.read() == b"ond\n"
+    assert cap.read() == b""
+
+
+@pytest.mark.parametrize("capture", CAPTURES)
+def test_readline(capture: str) -> None:
+    cap = CAPTURES[capture]()
+    cap.write(b"first\nsec")
+    assert cap.readline() == b"first\n"
+    assert cap.readline() == b"sec"
+    assert cap.readline() == b""
+    cap.write(b"ond\n")
+    assert cap.readline() == b"ond\n"
+
+
+@pytest.mark.parametrize("capture", [c for c in CAPTURES if c != "pipe"])
+def test_read_all(capture: str) -> None:
+    cap = CAPTURES[capture]()
+    cap.write(b"first\nsecond\n")
+    assert cap.read_all() == b""
+    cap.readline()
+    assert cap.read_all() == b"first\n"
+    cap.read()
+    assert cap.read_all() == b"first\nsecond\n"
+
+
+def test_read_all_with_pipe_capture() -> None:
+    cap = CAPTURES["pipe"]()
+    cap.write(b"first\nsecond\n")
+    cap.read()
+    assert cap.read_all() == b""
+
+
+@pytest.mark.parametrize("capture", [c for c in CAPTURES if c != "pipe"])
+def test_contents(capture: str) -> None:
+    cap = CAPTURES[capture]()
+    cap.write(b"first\nsecond\n")
+    cap.readline()
+    assert cap.contents() == b"first\nsecond\n"
+    assert cap.read() == b"second\n"
+
+
+def test_contents_with_pipe_capture() -> None:
+    cap = CAPTURES["pipe"]()
+    cap.write(b"first\n")
+    assert cap.contents() is None
+
+
+@pytest.mark.parametrize("capture", CAPTURES)
+def test_copy_to(capture: str, tmp_path: Path) -> None:
+    cap = CAPTURES[capture]()
+    cap.write(b"first\nsecond\n")
+    cap.readline()
+    with open(tmp_path / "out", "wb") as f:
+        assert cap.copy_to(f.fileno()) == 7
+        assert cap.copy_to(f.fileno()) == 0
+    assert (tmp_path / "out").read_bytes() == b"second\n"
+    assert cap.read() == b""
+
+
+def test_file_capture_is_unlinked(tmp_path: str) -> None:
+    cap = FileCapture(directory=str(tmp_path))
+    cap.write(b"hi\n")
+    assert os.listdir(tmp_path) == []
+    assert cap.read() == b"hi\n"
+    cap.close()
+    assert cap._fd == -1
+
+
+@pytest.mark.parametrize("capture", CAPTURES)
+def test_process_read(capture: str) -> None:
+    process = Process(1, "echo first; echo second")
+    process.run(capture)
+    process.wait()
+    assert process.readline() == b"first\n"
+    assert process.read() == b"second\n"
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import os
+import signal
+import time
+
+import pytest
+from pytest import MonkeyPatch
+
+from pyallel.engine import Engine
+from pyallel.process import Process
+
+
+def test_wait_wakes_on_output() -> None:
+    engine = Engine()
+    process = Process(1, "sleep 0.1; echo hi; sleep 0.5")
+    process.run()
+    engine.register(process)
+    start = time.perf_counter()
+    assert engine.wait(2) == [process]
+    assert time.perf_counter() - start < 0.5
+    assert process.read() == b"hi\n"
+    process.kill()
+
+
+def test_wait_wakes_on_closed_pipe() -> None:
+    engine = Engine()
+    process = Process(1, "exit 0")
+    process.run()
+    engine.register(process)
+    assert engine.wait(2) == [process]
+    assert process.fileno() == -1
+    assert engine.wait(0) == []
+
+
+def test_wait_times_out() -> None:
+    engine = Engine()
+    process = Process(1, "sleep 0.5")
+    process.run()
+    engine.register(process)
+    assert engine.wait(0.05) == []
+    process.kill()
+
+
+def test_wakeup() -> None:
+    engine = Engine()
+    engine.wakeup()
+    start = time.perf_counter()
+    assert engine.wait(2) == []
+    assert time.perf_counter() - start < 0.5
+
+
+def test_wait_records_exit() -> None:
+    engine = Engine()
+    process = Process(1, "sleep 0.1 &")
+    process.run()
+    engine.register(process)
+    while process.return_code() is None:
+        assert engine.wait(2)
+    assert process.return_code() == 0
+    assert process.end
+    assert process.exit_fileno() == -1
+
+
+@pytest.mark.parametrize("watch_child_signals", [True, False])
+def test_wait_records_exit_without_pidfd(
+    monkeypatch: MonkeyPatch, watch_child_signals: bool
+) -> None:
+    monkeypatch.delattr(os, "pidfd_open", raising=False)
+    handler = signal.getsignal(signal.SIGCHLD)
+    engine = Engine()
+    if watch_child_signals:
+        engine.watch_child_signals()
+    try:
+        process = Process(1, "exec 1>&-; exit 3")
+        process.run()
+        engine.register(process)
+        start = time.perf_counter()
+        while process.return_code() is None and time.perf_counter() - start < 2:
+            engine.wait(0.1)
+        assert process.return_code() == 3
+    finally:
+        signal.signal(signal.SIGCHLD, handler)
+
+
+def test_register_replaces_closed_fds() -> None:
+    engine = Engine()
+    process = Process(1, "echo hi")
+    process.run()
+    engine.register(process)
+    process.wait()
+    # Reading the output to the end closes the pipe without the engine knowing
+    assert process.read() == b"hi\n"
+
+    other = Process(2, "exit 0")
+    other.run()
+    engine.register(other)
+    while other.return_code() is None:
+        engine.wait(1)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+from pyallel.history import History, default_path
+
+
+def test_default_path() -> None:
+    assert default_path() == os.path.join(
+        os.environ["XDG_CACHE_HOME"], "pyallel", "history.jsonl"
+    )
+
+
+def test_record_and_estimate(tmp_path: Path) -> None:
+    path = str(tmp_path / "history.jsonl")
+    history = History(path)
+    assert history.estimate("make") is None
+
+    history.record("make", 2.0)
+    history.record("make", 4.0)
+    assert history.estimate("make") == 3.0
+    assert History(path).estimate("make") == 3.0
+    assert History(path).estimate("make test") is None
+
+
+def test_estimate_is_per_directory(tmp_path: Path) -> None:
+    path = str(tmp_path / "history.jsonl")
+    History(path).record("make", 2.0)
+    history = History(path)
+    history._cwd = str(tmp_path)
+    assert history.estimate("make") is None
+
+
+def test_invalid_records_are_ignored(tmp_path: Path) -> None:
+    path = tmp_path / "history.jsonl"
+    path.write_text('not json\n{"command": "make"}\n')
+    history = History(str(path))
+    history.record("make", 1.0)
+    assert History(str(path)).estimate("make") == 1.0
+
+
+def test_history_is_compacted(tmp_path: Path) -> None:
+    path = tmp_path / "history.jsonl"
+    history = History(str(path))
+    for _ in range(1100):
+        history.record("make", 1.0)
+
+    assert History(str(path)).estimate("make") == 1.0
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(records) < 100
+    assert all(
+        record == {"cwd": os.getcwd(), "command": "make", "duration": 1.0}
+        for record in records
+    )
+
+
+def test_least_recently_run_commands_are_forgotten(tmp_path: Path) -> None:
+    path = tmp_path / "history.jsonl"
+    history = History(str(path), max_entries=2)
+    for command in ("make", "make test", "make docs", "make test"):
+        history.record(command, 1.0)
+
+    assert history.estimate("make") is None
+    assert history.estimate("make docs") == 1.0
+    assert history.estimate("make test") == 1.0
+
+    history = History(str(path), max_entries=2)
+    assert history.estimate("make") is None
+    assert history.estimate("make docs") == 1.0
+
+
+def test_history_with_many_commands_stays_small(tmp_path: Path) -> None:
+    path = tmp_path / "history.jsonl"
+    history = History(str(path), max_entries=10)
+    for i in range(3000):
+        history.record(f"echo {i}", 1.0)
+
+    assert len(history._estimates or {}) == 10
+    assert len(path.read_text().splitlines()) <= 2 * 10 + 1000
+    assert History(str(path), max_entries=10).estimate("echo 2999") == 1.0
+
+
+def test_unwritable_history(tmp_path: Path) -> None:
+    path = tmp_path / "file"
+    path.write_text("")
+    history = History(str(path / "history.jsonl"))
+    history.record("make", 1.0)
+    assert history.estimate("make") == 1.0
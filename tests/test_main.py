@@ -1,8 +1,12 @@
+from __future__ import annotations
+
+import io
 import os
 import re
 import signal
 import subprocess
 import time
+from pathlib import Path
 
 import pytest
 from pyallel import main
@@ -83,6 +87,21 @@ class TestInteractiveMode:
         captured = capsys.readouterr()
         assert exit_code == 1, prettify_error(captured.out)
 
+    def test_run_with_after_modifier_finished_before_its_group(
+        self, capsys: CaptureFixture[str]
+    ) -> None:
+        exit_code = main.run(
+            "name=a :: true",
+            "sleep 0.5",
+            ":::",
+            "after=a :: echo early",
+            "-t",
+            "-j",
+            "4",
+        )
+        captured = capsys.readouterr()
+        assert exit_code == 0, prettify_error(captured.out)
+
     def test_run_timer_mode(self, capsys: CaptureFixture[str]) -> None:
         exit_code = main.run("echo hi")
         captured = capsys.readouterr()
@@ -299,6 +318,333 @@ class TestNonInteractiveMode:
             ]
         )
 
+    @pytest.mark.parametrize(
+        "args", [["-j", "1"], ["::: jobs=1"]], ids=["jobs option", "jobs modifier"]
+    )
+    def test_run_multiple_commands_with_jobs(
+        self, capsys: CaptureFixture[str], args: list[str]
+    ) -> None:
+        exit_code = main.run(
+            *args, "sleep 0.1; echo first", "echo hi", "-n", "--colour", "no"
+        )
+        captured = capsys.readouterr()
+        assert exit_code == 0, prettify_error(captured.out)
+        assert (
+            re.search(
+                "".join(
+                    [
+                        r"\[sleep 0.1; echo first\] running... \n",
+                        f"{PREFIX}first\n",
+                        r"\[sleep 0.1; echo first\] done ✔ \(0\.1s\)\n",
+                        r"\[echo hi\] running... \n",
+                        f"{PREFIX}hi\n",
+                        r"\[echo hi\] done ✔ \(0\.0s\)\n",
+                        "\n",
+                        "Done!\n",
+                    ]
+                ),
+                captured.out,
+            )
+            is not None
+        ), prettify_error(captured.out)
+
+    def test_run_with_after_modifier(self, capsys: CaptureFixture[str]) -> None:
+        exit_code = main.run(
+            "name=fail :: exit 1",
+            "name=build :: echo build",
+            ":::",
+            "after=build :: echo test",
+            "echo docs",
+            "-n",
+            "-t",
+            "--colour",
+            "no",
+        )
+        captured = capsys.readouterr()
+        assert exit_code == 1, prettify_error(captured.out)
+        assert captured.out.splitlines(keepends=True) == (
+            [
+                "[exit 1] running... \n",
+                "[exit 1] failed ✘\n",
+                "[echo build] running... \n",
+                f"{PREFIX}build\n",
+                "[echo build] done ✔\n",
+                "[echo test] running... \n",
+                f"{PREFIX}test\n",
+                "[echo test] done ✔\n",
+                "[echo docs] skipped \n",
+                "\n",
+                "Failed!\n",
+            ]
+        )
+
+    @pytest.mark.parametrize("output", ["ordered", "interleaved", "grouped", "raw"])
+    def test_run_with_after_modifier_finished_before_its_group(
+        self, capfd: pytest.CaptureFixture[str], output: str
+    ) -> None:
+        # The command in the second group runs (and finishes) while the first group is still running
+        exit_code = main.run(
+            "name=a :: true",
+            "sleep 0.5",
+            ":::",
+            "after=a :: echo early",
+            "-n",
+            "-t",
+            "-j",
+            "4",
+            "--output",
+            output,
+            "--colour",
+            "no",
+        )
+        captured = capfd.readouterr()
+        assert exit_code == 0, prettify_error(captured.out)
+        assert "early\n" in captured.out
+        assert captured.out.endswith("Done!\n")
+
+    def test_run_interleaved(self, capsys: CaptureFixture[str]) -> None:
+        exit_code = main.run(
+            "name=slow :: printf 'first '; sleep 0.2; echo line; echo done",
+            "echo fast; exit 1",
+            ":::",
+            "echo skipped",
+            "-n",
+            "-t",
+            "-j",
+            "2",
+            "--output",
+            "interleaved",
+            "--colour",
+            "no",
+        )
+        captured = capsys.readouterr()
+        assert exit_code == 1, prettify_error(captured.out)
+        assert captured.out.splitlines(keepends=True) == (
+            [
+                "echo fast; exit 1 | fast\n",
+                "echo fast; exit 1 | [echo fast; exit 1] failed ✘\n",
+                "slow              | first line\n",
+                "slow              | done\n",
+                "slow              | [printf 'first '; sleep 0.2; echo line; echo done] done ✔\n",
+                "\n",
+                "Failed!\n",
+            ]
+        )
+
+    def test_run_grouped(self, capsys: CaptureFixture[str]) -> None:
+        exit_code = main.run(
+            "echo slow; sleep 0.2; echo done",
+            "echo fast; exit 1",
+            ":::",
+            "echo skipped",
+            "-n",
+            "-t",
+            "-j",
+            "2",
+            "--output",
+            "grouped",
+            "--colour",
+            "no",
+        )
+        captured = capsys.readouterr()
+        assert exit_code == 1, prettify_error(captured.out)
+        assert captured.out.splitlines(keepends=True) == (
+            [
+                "[echo fast; exit 1] failed ✘\n",
+                f"{PREFIX}fast\n",
+                "[echo slow; sleep 0.2; echo done] done ✔\n",
+                f"{PREFIX}slow\n",
+                f"{PREFIX}done\n",
+                "\n",
+                "Failed!\n",
+            ]
+        )
+
+    def test_run_grouped_output_without_newline(
+        self, capsys: CaptureFixture[str]
+    ) -> None:
+        exit_code = main.run(
+            "printf 'a1\\na2'",
+            "sleep 0.3; echo b1",
+            "-n",
+            "-t",
+            "-j",
+            "2",
+            "--output",
+            "grouped",
+            "--colour",
+            "no",
+        )
+        captured = capsys.readouterr()
+        assert exit_code == 0, prettify_error(captured.out)
+        assert captured.out.splitlines(keepends=True) == (
+            [
+                "[printf 'a1\\na2'] done ✔\n",
+                f"{PREFIX}a1\n",
+                f"{PREFIX}a2\n",
+                "[sleep 0.3; echo b1] done ✔\n",
+                f"{PREFIX}b1\n",
+                "\n",
+                "Done!\n",
+            ]
+        )
+
+    def test_run_raw(self, capfd: pytest.CaptureFixture[str]) -> None:
+        exit_code = main.run(
+            "printf 'first\\nno newline'",
+            "echo second",
+            "-n",
+            "-t",
+            "--output",
+            "raw",
+            "--colour",
+            "no",
+        )
+        captured = capfd.readouterr()
+        assert exit_code == 0, prettify_error(captured.out)
+        assert captured.out.splitlines(keepends=True) == (
+            [
+                "[printf 'first\\nno newline'] running... \n",
+                "first\n",
+                "no newline[printf 'first\\nno newline'] done ✔\n",
+                "[echo second] running... \n",
+                "second\n",
+                "[echo second] done ✔\n",
+                "\n",
+                "Done!\n",
+            ]
+        )
+
+    def test_run_with_inputs_modifier(
+        self, capsys: CaptureFixture[str], tmp_path: Path
+    ) -> None:
+        counter = tmp_path / "counter"
+        command = f"inputs={tmp_path}/*.txt :: echo run >> {counter}; echo built"
+        (tmp_path / "a.txt").write_text("a")
+        for _ in range(2):
+            exit_code = main.run(command, "-n", "--colour", "no")
+            captured = capsys.readouterr()
+            assert exit_code == 0, prettify_error(captured.out)
+
+        assert counter.read_text() == "run\n"
+        assert captured.out.splitlines(keepends=True)[1:] == (
+            [
+                f"{PREFIX}built\n",
+                f"[echo run >> {counter}; echo built] done ✔ (cached)\n",
+                "\n",
+                "Done!\n",
+            ]
+        )
+
+        (tmp_path / "a.txt").write_text("b")
+        assert main.run(command, "-n", "--colour", "no") == 0
+        assert main.run(command, "-n", "--colour", "no", "--no-cache") == 0
+        assert counter.read_text() == "run\nrun\nrun\n"
+
+    def test_run_commands_from_file(
+        self, capsys: CaptureFixture[str], tmp_path: Path
+    ) -> None:
+        commands = tmp_path / "commands"
+        commands.write_text("echo first\n\nsleep 0.2; echo second\n")
+        exit_code = main.run(
+            "--commands-from", str(commands), "-n", "-t", "-j", "1", "--colour", "no"
+        )
+        captured = capsys.readouterr()
+        assert exit_code == 0, prettify_error(captured.out)
+        assert captured.out.splitlines(keepends=True) == (
+            [
+                "[echo first] done ✔\n",
+                f"{PREFIX}first\n",
+                "[sleep 0.2; echo second] done ✔\n",
+                f"{PREFIX}second\n",
+                "\n",
+                "Done!\n",
+            ]
+        )
+
+    def test_run_commands_from_stdin(
+        self, capsys: CaptureFixture[str], monkeypatch: MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr("sys.stdin", io.StringIO("exit 1\necho after\n"))
+        exit_code = main.run(
+            "--commands-from", "-", "-n", "-t", "-j", "1", "--colour", "no"
+        )
+        captured = capsys.readouterr()
+        assert exit_code == 1, prettify_error(captured.out)
+        assert captured.out.splitlines(keepends=True) == (
+            [
+                "[exit 1] failed ✘\n",
+                "[echo after] done ✔\n",
+                f"{PREFIX}after\n",
+                "\n",
+                "Failed!\n",
+            ]
+        )
+
+    def test_run_args_from(self, capsys: CaptureFixture[str], tmp_path: Path) -> None:
+        args = tmp_path / "args"
+        args.write_text("one\ntwo words\nthree\n")
+        exit_code = main.run(
+            "--args-from",
+            str(args),
+            "--max-args",
+            "2",
+            "printf '%s\\n' {}",
+            "-n",
+            "-t",
+            "--colour",
+            "no",
+        )
+        captured = capsys.readouterr()
+        assert exit_code == 0, prettify_error(captured.out)
+        assert captured.out.splitlines(keepends=True) == (
+            [
+                "[printf '%s\\n' one 'two words'] running... \n",
+                f"{PREFIX}one\n",
+                f"{PREFIX}two words\n",
+                "[printf '%s\\n' one 'two words'] done ✔\n",
+                "[printf '%s\\n' three] running... \n",
+                f"{PREFIX}three\n",
+                "[printf '%s\\n' three] done ✔\n",
+                "\n",
+                "Done!\n",
+            ]
+        )
+
+    def test_run_with_shell_pool(self, capsys: CaptureFixture[str]) -> None:
+        exit_code = main.run(
+            "echo $((1 + 1)) | cat",
+            "exit 1",
+            "-n",
+            "-t",
+            "--shell-pool",
+            "--colour",
+            "no",
+        )
+        captured = capsys.readouterr()
+        assert exit_code == 1, prettify_error(captured.out)
+        assert captured.out.splitlines(keepends=True) == (
+            [
+                "[echo $((1 + 1)) | cat] running... \n",
+                f"{PREFIX}2\n",
+                "[echo $((1 + 1)) | cat] done ✔\n",
+                "[exit 1] running... \n",
+                "[exit 1] failed ✘\n",
+                "\n",
+                "Failed!\n",
+            ]
+        )
+
+    def test_run_with_invalid_jobs_modifier(self, capsys: CaptureFixture[str]) -> None:
+        exit_code = main.run("::: jobs=0", "echo hi", "-n", "--colour", "no")
+        captured = capsys.readouterr()
+        assert exit_code == 1, prettify_error(captured.out)
+        assert captured.out.splitlines(keepends=True) == (
+            [
+                "Error: jobs modifier must be a number greater than 0\n",
+            ]
+        )
+
     def test_run_timer_mode(self, capsys: CaptureFixture[str]) -> None:
         exit_code = main.run("echo hi", "-n", "--colour", "no")
         captured = capsys.readouterr()
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import os
+import signal
+from typing import Iterator
+
+import pytest
+
+from pyallel.engine import Engine
+from pyallel.pool import ShellJob, ShellPool
+from pyallel.process import Process
+from pyallel.process_group import ProcessGroup
+from pyallel.scheduler import Scheduler
+
+pytestmark = pytest.mark.skipif(
+    not ShellPool.supported(), reason="shell workers need /proc"
+)
+
+
+@pytest.fixture
+def pool() -> Iterator[ShellPool]:
+    pool = ShellPool(2)
+    yield pool
+    pool.close()
+
+
+def test_run(pool: ShellPool) -> None:
+    process = Process(1, "echo out; echo err >&2; exit 3")
+    process.run(pool=pool)
+    assert process.wait() == 3
+    assert process.return_code() == 3
+    assert process.read() == b"out\nerr\n"
+
+
+def test_commands_run_in_subshells(pool: ShellPool) -> None:
+    for i, command in enumerate(["cd / && export POOL_TEST=1", "pwd; echo $POOL_TEST"]):
+        process = Process(i, command)
+        process.run(pool=pool)
+        assert process.wait() == 0
+
+    assert process.read() == f"{os.getcwd()}\n\n".encode()
+
+
+def test_commands_without_a_shell_are_not_pooled(pool: ShellPool) -> None:
+    process = Process(1, "echo direct")
+    process.run(pool=pool)
+    assert not isinstance(process._process, ShellJob)
+    assert process.wait() == 0
+    assert process.read() == b"direct\n"
+
+
+def test_run_when_all_workers_are_busy(pool: ShellPool) -> None:
+    processes = [Process(i, "sleep 0.1; echo $0") for i in range(3)]
+    for process in processes:
+        process.run(pool=pool)
+
+    # The third process is run in its own shell instead
+    assert [isinstance(process._process, ShellJob) for process in processes] == [
+        True,
+        True,
+        False,
+    ]
+    assert [process.wait() for process in processes] == [0, 0, 0]
+    assert [process.read() for process in processes] == [b"/bin/sh\n"] * 3
+
+
+def test_interrupt(pool: ShellPool) -> None:
+    process = Process(1, "sleep 10; echo never")
+    process.run(pool=pool)
+    process.kill()
+    assert process.wait() == 128 + signal.SIGKILL
+    assert process.read() == b""
+
+    # The worker keeps running commands
+    process = Process(2, "echo $((1 + 1))")
+    process.run(pool=pool)
+    assert process.wait() == 0
+    assert process.read() == b"2\n"
+
+
+def test_dead_workers_are_replaced(pool: ShellPool) -> None:
+    for worker in pool._workers:
+        worker._process.kill()
+        worker._process.wait()
+
+    process = Process(1, "echo $((1 + 1))")
+    process.run(pool=pool)
+    assert process.wait() == 0
+    assert process.read() == b"2\n"
+
+
+def test_schedule_with_engine(pool: ShellPool) -> None:
+    engine = Engine()
+    scheduler = Scheduler(engine, jobs=2, pool=pool)
+    processes = [Process(i, f"sleep 0.1; echo {i}") for i in range(1, 5)]
+    scheduler.add(ProcessGroup(id=1, processes=processes))
+
+    while any(process.return_code() is None for process in processes):
+        scheduler.schedule()
+        engine.wait(1)
+
+    assert [process.read() for process in processes] == [
+        f"{i}\n".encode() for i in range(1, 5)
+    ]
@@ -1,9 +1,25 @@
 from __future__ import annotations
 
+import time
 from typing import Any
 import pytest
+from pyallel import constants
 from pyallel.colours import Colours
-from pyallel.printer import Printer, get_num_lines, set_process_lines
+from pyallel.constants import (
+    CLEAR_DOWN,
+    CLEAR_LINE,
+    DOWN_LINES,
+    SYNC_END,
+    SYNC_START,
+    UP_LINES,
+)
+from pyallel.printer import (
+    Printer,
+    get_num_lines,
+    measure_line,
+    set_process_lines,
+    truncate_line,
+)
 from pyallel.process import Process, ProcessOutput
 from pyallel.process_group import ProcessGroupOutput
 
@@ -50,6 +66,28 @@ def test_get_num_lines_ignores_ansi_chars(chars: str) -> None:
     assert get_num_lines(chars * 100, columns=10) == 1
 
 
+@pytest.mark.parametrize(
+    "line,expected",
+    (
+        pytest.param("hello", ("hello", 5), id="ascii"),
+        pytest.param("\x1B[1mhello\x1B[0m", ("hello", 5), id="ansi"),
+        pytest.param("日本語", ("日本語", 6), id="wide characters"),
+        pytest.param("e\u0301", ("e\u0301", 1), id="combining characters"),
+    ),
+)
+def test_measure_line(line: str, expected: tuple[str, int]) -> None:
+    assert measure_line(line) == expected
+
+
+def test_get_num_lines_with_wide_characters() -> None:
+    assert get_num_lines("日本語", columns=5) == 2
+
+
+def test_truncate_line() -> None:
+    assert truncate_line("\x1B[1mhello\x1B[0m", columns=3) == "hel..."
+    assert truncate_line("日本語", columns=5) == "日本..."
+
+
 def test_set_process_lines() -> None:
     output = ProcessGroupOutput(
         id=1,
@@ -171,6 +209,69 @@ def test_set_process_lines_with_fixed_and_dynamic_lines(
     assert output.processes[2].process.lines == expected_lines3
 
 
+def test_set_process_lines_with_more_processes_than_lines() -> None:
+    running = ProcessOutput(
+        id=1, process=Process(1, "sleep 10"), data="".join(f"{i}\n" for i in range(10))
+    )
+    running.process.run()
+    queued = [
+        ProcessOutput(id=i, process=Process(i, "make"), data="output\n")
+        for i in range(2, 6)
+    ]
+
+    set_process_lines(ProcessGroupOutput(id=1, processes=[running, *queued]), lines=4)
+    running.process.kill()
+    running.process.wait()
+
+    assert running.process.lines == 3
+    assert [q.process.lines for q in queued] == [1, 0, 0, 0]
+
+
+def test_set_process_lines_with_hundreds_of_processes() -> None:
+    processes = [
+        ProcessOutput(id=i, process=Process(i, "exit 0"), data="output\n")
+        for i in range(300)
+    ]
+    # The first processes have finished, so the status lines start from the first queued process
+    for process_output in processes[:100]:
+        process_output.process.run()
+        process_output.process.wait()
+        process_output.process.end -= constants.RECENTLY_ACTIVE
+    failed = ProcessOutput(id=300, process=Process(300, "exit 1"), data="error\n")
+    failed.process.run()
+    failed.process.wait()
+    output = ProcessGroupOutput(id=1, processes=[*processes, failed])
+
+    set_process_lines(output, lines=50)
+
+    assert sum(p.process.lines for p in output.processes) == 50
+    assert failed.process.lines == 2
+    assert [p.process.lines for p in output.processes[100:148]] == [1] * 48
+    assert sum(p.process.lines for p in output.processes[:100]) == 0
+
+
+def test_printer_generate_process_group_output_with_summary(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(constants, "LINES", lambda: 4)
+    printer = Printer(colours=Colours.from_colour("no"))
+    processes = [Process(i, "exit 1" if i == 1 else "exit 0") for i in range(1, 6)]
+    for process in processes[:2]:
+        process.run()
+        process.wait()
+    processes[4].skip()
+
+    output = printer.generate_process_group_output(
+        ProcessGroupOutput(
+            id=1, processes=[ProcessOutput(id=p.id, process=p) for p in processes]
+        )
+    )
+    assert output[0] == (
+        False,
+        "5 commands: 1 done 1 failed 1 skipped 2 queued",
+        "\n",
+    )
+    assert len(output) == 3
 @pytest.mark.parametrize(
     "kwargs,lines,expected",
     (
@@ -287,3 +388,103 @@ def test_printer_generate_process_group_output() -> None:
         (True, "third", "\n"),
         (True, "fourth", "\n"),
     ]
+
+
+def test_printer_generate_process_output_status_queued_and_skipped() -> None:
+    printer = Printer(colours=Colours.from_colour("no"), timer=True)
+    process = Process(1, "echo first")
+    output = ProcessOutput(id=1, process=process)
+    assert printer.generate_process_output_status(output) == "[echo first] queued "
+    process.skip()
+    assert printer.generate_process_output_status(output) == "[echo first] skipped "
+
+
+@pytest.mark.parametrize(
+    "estimate,expected",
+    (
+        (3.0, "[sleep 1] running...  (1.0s, ~2.0s left)"),
+        (0.5, "[sleep 1] running...  (1.0s, 0.5s over)"),
+        (None, "[sleep 1] running...  (1.0s)"),
+    ),
+)
+def test_printer_generate_process_output_status_with_estimate(
+    estimate: float | None, expected: str
+) -> None:
+    printer = Printer(colours=Colours.from_colour("no"), timer=True)
+    process = Process(1, "sleep 1")
+    process.run()
+    process.start -= 1.0
+    process.estimate = estimate
+    output = ProcessOutput(id=1, process=process)
+    assert (
+        printer.generate_process_output_status(output, include_progress=False)
+        == expected
+    )
+    process.kill()
+
+
+def test_printer_generate_process_group_output_with_eta() -> None:
+    printer = Printer(colours=Colours.from_colour("no"), timer=True)
+    process = Process(1, "echo first")
+    output = printer.generate_process_group_output(
+        ProcessGroupOutput(id=1, processes=[ProcessOutput(id=1, process=process)]),
+        eta=(1.5, 10.0),
+    )
+    assert output[-1] == (False, "ETA: group ~1.5s, all ~10.0s", "\n")
+
+
+def test_printer_generate_eta() -> None:
+    printer = Printer(colours=Colours.from_colour("no"))
+    assert printer.generate_eta(None, None) == ""
+    assert printer.generate_eta(None, 2.0) == "ETA: all ~2.0s"
+
+
+def test_printer_render_progress_group_output_only_rewrites_changed_lines(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    printer = Printer(colours=Colours.from_colour("no"))
+    process = Process(1, "echo first")
+    output = ProcessOutput(id=1, process=process, data="first\n")
+    group = ProcessGroupOutput(id=1, processes=[output])
+
+    printer.render_progress_group_output(group)
+    assert capsys.readouterr().out == (
+        f"{CLEAR_LINE}[echo first] queued \n{CLEAR_LINE}=> first\n"
+    )
+
+    printer.render_progress_group_output(group)
+    assert capsys.readouterr().out == ""
+
+    output.append("second\n")
+    printer.render_progress_group_output(group)
+    assert capsys.readouterr().out == (
+        f"{UP_LINES.format(2)}{DOWN_LINES.format(2)}{CLEAR_LINE}=> second\n"
+    )
+
+    process.skip()
+    printer.render_progress_group_output(group)
+    assert capsys.readouterr().out == (
+        f"{UP_LINES.format(3)}{CLEAR_LINE}[echo first] skipped \n{DOWN_LINES.format(2)}"
+    )
+
+    other = ProcessOutput(id=2, process=Process(2, "echo other"))
+    printer.render_progress_group_output(ProcessGroupOutput(id=2, processes=[other]))
+    assert capsys.readouterr().out == (
+        f"{UP_LINES.format(3)}{CLEAR_LINE}[echo other] queued \n{CLEAR_DOWN}"
+    )
+
+    printer.clear_printed_lines()
+    printer.ok("Done!")
+    assert capsys.readouterr().out == f"{UP_LINES.format(1)}{CLEAR_DOWN}Done!\n"
+
+
+def test_printer_writes_synchronized_updates(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    printer = Printer(colours=Colours.from_colour("no"), sync=True)
+    printer.write("first")
+    printer.write("second")
+    assert capsys.readouterr().out == ""
+
+    printer.flush()
+    assert capsys.readouterr().out == f"{SYNC_START}first\nsecond\n{SYNC_END}"
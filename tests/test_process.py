@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import os
 import time
+from pathlib import Path
 
 import pytest
 
-from pyallel.errors import InvalidLinesModifierError
-from pyallel.process import Process
+from pyallel.errors import (
+    InvalidAfterModifierError,
+    InvalidEnvModifierError,
+    InvalidInputsModifierError,
+    InvalidLinesModifierError,
+    InvalidNameModifierError,
+    InvalidShellModifierError,
+)
+from pyallel.process import Process, ProcessOutput, split_command
 
 
 def test_from_command() -> None:
@@ -36,6 +45,132 @@ def test_from_command_with_invalid_lines_modifier(value: str) -> None:
         Process.from_command(1, f"lines={value} :: sleep 0.1")
 
 
+def test_from_command_with_multiple_modifiers() -> None:
+    process = Process.from_command(1, "name=build lines=50 after=lint,fmt :: make")
+    assert process.command == "make"
+    assert process.percentage_lines == 0.5
+    assert process.name == "build"
+    assert process.after == ["lint", "fmt"]
+
+
+@pytest.mark.parametrize("value", ["", "a,b"])
+def test_from_command_with_invalid_name_modifier(value: str) -> None:
+    with pytest.raises(InvalidNameModifierError):
+        Process.from_command(1, f"name={value} :: sleep 0.1")
+
+
+@pytest.mark.parametrize("value", ["", "a,", ",b"])
+def test_from_command_with_invalid_after_modifier(value: str) -> None:
+    with pytest.raises(InvalidAfterModifierError):
+        Process.from_command(1, f"after={value} :: sleep 0.1")
+
+
+def test_from_command_with_inputs_and_env_modifiers() -> None:
+    process = Process.from_command(1, "inputs=src/**/*.py,setup.cfg env=CI :: mypy .")
+    assert process.command == "mypy ."
+    assert process.inputs == ["src/**/*.py", "setup.cfg"]
+    assert process.env == ["CI"]
+
+
+@pytest.mark.parametrize("value", ["", "a,", ",b"])
+def test_from_command_with_invalid_inputs_modifier(value: str) -> None:
+    with pytest.raises(InvalidInputsModifierError):
+        Process.from_command(1, f"inputs={value} :: sleep 0.1")
+
+
+@pytest.mark.parametrize("value", ["", "a,", ",b"])
+def test_from_command_with_invalid_env_modifier(value: str) -> None:
+    with pytest.raises(InvalidEnvModifierError):
+        Process.from_command(1, f"env={value} :: sleep 0.1")
+
+
+@pytest.mark.parametrize("value, expected", [("yes", True), ("no", False)])
+def test_from_command_with_shell_modifier(value: str, expected: bool) -> None:
+    process = Process.from_command(1, f"shell={value} :: echo hi")
+    assert process.command == "echo hi"
+    assert process.shell is expected
+
+
+@pytest.mark.parametrize("command", ["shell=auto :: echo hi", "shell=no :: echo 'hi"])
+def test_from_command_with_invalid_shell_modifier(command: str) -> None:
+    with pytest.raises(InvalidShellModifierError):
+        Process.from_command(1, command)
+
+
+@pytest.mark.parametrize(
+    "command, expected",
+    [
+        ("echo hi", ["echo", "hi"]),
+        ("echo 'a b' \"c d\"", ["echo", "a b", "c d"]),
+        ("echo hi | cat", None),
+        ("echo $HOME", None),
+        ("echo *.py", None),
+        ("echo hi; echo there", None),
+        ("FORCE_COLOR=1 echo hi", None),
+        ("exit 1", None),
+        ("cd src", None),
+        ("echo 'unclosed", None),
+        ("", None),
+        ("pyallel-missing-program", None),
+    ],
+)
+def test_split_command(command: str, expected: list[str] | None) -> None:
+    argv = split_command(command)
+    if expected is None:
+        assert argv is None
+    else:
+        assert argv is not None
+        assert argv[0].endswith("/echo")
+        assert argv[1:] == expected[1:]
+
+
+def test_run_without_shell() -> None:
+    process = Process(1, "printf '%s %s' '$HOME' *.py", shell=False)
+    process.run()
+    assert process.wait() == 0
+    assert process.read() == b"$HOME *.py"
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+def test_run_without_shell_closes_inherited_fds() -> None:
+    read_fd, write_fd = os.pipe()
+    os.set_inheritable(write_fd, True)
+    try:
+        process = Process(1, "ls /proc/self/fd", shell=False)
+        process.run()
+        assert process.wait() == 0
+        assert str(write_fd) not in process.read().decode().split()
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+def test_run_script_without_shebang(tmp_path: Path) -> None:
+    script = tmp_path / "script.sh"
+    script.write_text("echo hi\n")
+    script.chmod(0o755)
+
+    # A shell runs it as a shell script, so it is run in one when the command doesn't need one
+    process = Process(1, str(script))
+    process.run()
+    assert process.wait() == 0
+    assert process.read() == b"hi\n"
+
+    process = Process(1, str(script), shell=False)
+    process.run()
+    assert process.wait() == 126
+    assert process.read() == f"pyallel: {script}: Exec format error\n".encode()
+
+
+def test_run_missing_program_without_shell() -> None:
+    process = Process(1, "pyallel-missing-program --help", shell=False)
+    process.run()
+    assert process.wait() == 127
+    assert process.read() == (
+        b"pyallel: pyallel-missing-program: No such file or directory\n"
+    )
+
+
 def test_from_command_handles_invalid_args_syntax() -> None:
     expected_process = Process(id=1, command="sleep 0.1")
     process = Process.from_command(1, " :: sleep 0.1 :: echo hi")
@@ -103,3 +238,71 @@ def test_readline_handles_delayed_newline() -> None:
     time.sleep(0.3)
     output = process.readline()
     assert output == b"second\n"
+
+
+@pytest.mark.parametrize(
+    "data,lines",
+    [("", 1), ("first", 2), ("first\n", 2), ("first\nsecond", 3), ("a\nb\nc\n", 4)],
+)
+def test_output_lines(data: str, lines: int) -> None:
+    output = ProcessOutput(id=1, process=Process(1, "echo"), data=data)
+    assert output.lines == lines
+
+
+def test_output_merge_counts_lines_across_chunks() -> None:
+    output = ProcessOutput(id=1, process=Process(1, "echo"), data="fir")
+    output.merge(ProcessOutput(id=1, process=Process(1, "echo"), data="st\nsec"))
+    output.merge(ProcessOutput(id=1, process=Process(1, "echo"), data="ond\n"))
+    assert output.data == "first\nsecond\n"
+    assert output.lines == 3
+
+
+@pytest.mark.parametrize(
+    "lines,expected",
+    [
+        (0, []),
+        (1, ["third"]),
+        (2, ["second\n", "third"]),
+        (5, ["first\n", "second\n", "third"]),
+    ],
+)
+def test_output_tail(lines: int, expected: list[str]) -> None:
+    output = ProcessOutput(id=1, process=Process(1, "echo"), data="fir")
+    output.append("st\nsecond\nth")
+    output.append("ird")
+    assert output.tail(lines) == expected
+
+
+def test_output_scrollback_drops_old_lines() -> None:
+    output = ProcessOutput(id=1, process=Process(1, "echo"), scrollback=5)
+    for i in range(1, 101):
+        output.append(f"line {i}\n")
+
+    assert output.lines == 101
+    assert len(output.data.splitlines()) <= 10
+    assert output.tail(5) == [f"line {i}\n" for i in range(96, 101)]
+
+
+def test_output_full_reads_dropped_lines_from_capture_file() -> None:
+    process = Process(1, "for i in $(seq 1 100); do echo line $i; done")
+    process.run()
+    process.wait()
+    output = ProcessOutput(id=1, process=process, scrollback=5)
+    output.append(process.read().decode())
+
+    assert output.tail(1) == ["line 100\n"]
+    assert output.full() == "".join(f"line {i}\n" for i in range(1, 101))
+
+
+def test_remaining() -> None:
+    process = Process(1, "exit 0")
+    assert process.remaining() is None
+    process.estimate = 2.0
+    assert process.remaining() == 2.0
+    process.start = time.perf_counter() - 1.5
+    assert 0.4 < (process.remaining() or 0) <= 0.5
+    process.start = time.perf_counter() - 3.0
+    assert process.remaining() == 0.0
+    process.end = time.perf_counter()
+    process.estimate = None
+    assert process.remaining() == 0.0
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import io
+import signal
+import threading
+from typing import Iterator
+
+import pytest
+
+from pyallel.process import Process
+from pyallel.process_feed import ProcessFeed, read_commands
+
+
+def run_feed(process_feed: ProcessFeed) -> list[Process]:
+    finished: list[Process] = []
+    while True:
+        finished.extend(process_feed.update())
+        if process_feed.poll() is not None:
+            return finished
+        process_feed.wait(1)
+
+
+def test_read_commands() -> None:
+    file = io.StringIO("echo one\n\n   \necho two\r\necho three")
+    assert list(read_commands(file)) == ["echo one", "echo two", "echo three"]
+
+
+def test_update() -> None:
+    process_feed = ProcessFeed(["echo one", "exit 2", "echo three"], jobs=2)
+    finished = run_feed(process_feed)
+
+    assert sorted(process.command for process in finished) == [
+        "echo one",
+        "echo three",
+        "exit 2",
+    ]
+    assert [process.id for process in finished if process.return_code()] == [2]
+    assert process_feed.poll() == 1
+
+
+def test_update_only_takes_commands_for_free_job_slots() -> None:
+    taken = 0
+
+    def commands() -> Iterator[str]:
+        nonlocal taken
+        for _ in range(12):
+            taken += 1
+            yield "sleep 0.1"
+
+    process_feed = ProcessFeed(commands(), jobs=2)
+
+    finished = 0
+    most_running = 0
+    most_read_ahead = 0
+    while True:
+        finished += len(process_feed.update())
+        most_running = max(most_running, len(process_feed._running))
+        most_read_ahead = max(
+            most_read_ahead, taken - finished - len(process_feed._running)
+        )
+        if process_feed.poll() is not None:
+            break
+        process_feed.wait(1)
+
+    assert taken == 12
+    assert most_running == 2
+    # The queued commands and the one waiting to be queued
+    assert most_read_ahead <= 3
+    assert process_feed.poll() == 0
+
+
+def test_update_does_not_wait_for_commands() -> None:
+    more = threading.Event()
+
+    def commands() -> Iterator[str]:
+        yield "echo first"
+        more.wait(5)
+        yield "echo second"
+
+    process_feed = ProcessFeed(commands(), jobs=2)
+    finished: list[Process] = []
+    while not finished:
+        finished.extend(process_feed.update())
+        process_feed.wait(1)
+
+    assert [process.command for process in finished] == ["echo first"]
+    assert finished[0].end - finished[0].start < 1
+    assert process_feed.poll() is None
+
+    more.set()
+    finished = run_feed(process_feed)
+    assert [process.command for process in finished] == ["echo second"]
+    assert process_feed.poll() == 0
+
+
+def test_update_raises_errors_from_the_commands() -> None:
+    def commands() -> Iterator[str]:
+        yield "echo first"
+        raise ValueError("bad command")
+
+    process_feed = ProcessFeed(commands(), jobs=1)
+    with pytest.raises(ValueError, match="bad command"):
+        run_feed(process_feed)
+
+
+def test_handle_signal_stops_taking_commands() -> None:
+    process_feed = ProcessFeed(["sleep 10", "echo never"], jobs=1)
+    while not process_feed._running:
+        process_feed.update()
+        process_feed.wait(1)
+    process_feed.handle_signal(signal.SIGINT, None)
+
+    finished = run_feed(process_feed)
+    assert [process.command for process in finished] == ["sleep 10"]
+    assert process_feed.poll() == 128 + signal.SIGINT
@@ -66,7 +66,8 @@ def test_stream() -> None:
             Process(id=3, command="echo third"),
         ],
     )
-    process_group.run()
+    for process in process_group.processes:
+        process.run()
     time.sleep(0.1)
     output = process_group.stream()
     assert len(output.processes) == 3
@@ -82,7 +83,7 @@ def test_output_merge() -> None:
                 data="first\nhi\n",
             ),
             ProcessOutput(
-                id=1, process=Process(id=2, command="echo second"), data="second\n"
+                id=2, process=Process(id=2, command="echo second"), data="second\n"
             ),
             ProcessOutput(
                 id=3, process=Process(id=3, command="echo third"), data="third\n"
@@ -100,7 +101,7 @@ def test_output_merge() -> None:
                     data="bye\n",
                 ),
                 ProcessOutput(
-                    id=1, process=Process(id=2, command="echo second"), data="hi\n"
+                    id=2, process=Process(id=2, command="echo second"), data=""
                 ),
                 ProcessOutput(
                     id=3, process=Process(id=3, command="echo third"), data="five\n"
@@ -110,3 +111,8 @@ def test_output_merge() -> None:
     )
 
     assert len(output.processes) == 3
+    assert [p.data for p in output.processes] == [
+        "first\nhi\nbye\n",
+        "second\n",
+        "third\nfive\n",
+    ]
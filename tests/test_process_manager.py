@@ -3,6 +3,11 @@ import time
 
 
 import pytest
+from pyallel.errors import (
+    InvalidAfterModifierError,
+    InvalidJobsModifierError,
+    InvalidNameModifierError,
+)
 from pyallel.process import Process
 from pyallel.process_group import ProcessGroup
 from pyallel.process_group_manager import ProcessGroupManager
@@ -138,3 +143,115 @@ def test_from_args_with_separators(
     assert len(process_group_manager._process_groups) == len(
         expected_process_group_manager._process_groups
     )
+
+
+def test_from_args_with_group_modifiers() -> None:
+    process_group_manager = ProcessGroupManager.from_args(
+        "::: jobs=2",
+        "sleep 0.1",
+        "sleep 0.2",
+        "::: jobs=1",
+        "sleep 0.3",
+        ":::",
+        "sleep 0.4",
+    )
+    process_groups = process_group_manager._process_groups
+    assert [pg.jobs for pg in process_groups] == [2, 1, 0]
+    assert [len(pg.processes) for pg in process_groups] == [2, 1, 1]
+    assert [p.id for pg in process_groups for p in pg.processes] == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("value", ["0", "-1", "invalid", ""])
+def test_from_args_with_invalid_jobs_modifier(value: str) -> None:
+    with pytest.raises(
+        InvalidJobsModifierError,
+        match="jobs modifier must be a number greater than 0",
+    ):
+        ProcessGroupManager.from_args(f"::: jobs={value}", "sleep 0.1")
+
+
+def test_stream_starts_queued_processes() -> None:
+    pg_manager = ProcessGroupManager(
+        process_groups=[
+            ProcessGroup(
+                id=1,
+                processes=[
+                    Process(id=1, command="echo first"),
+                    Process(id=2, command="echo second"),
+                ],
+            ),
+        ],
+        jobs=1,
+    )
+    pg_manager.run()
+    first, second = pg_manager._output.process_group_outputs[1].processes
+    assert not first.process.queued
+    assert second.process.queued
+    while pg_manager.poll() is None:
+        pg_manager.wait(1)
+        pg_manager.stream()
+    assert first.data == "first\n"
+    assert second.data == "second\n"
+
+
+def test_from_args_links_dependencies() -> None:
+    process_group_manager = ProcessGroupManager.from_args(
+        "name=lint :: echo lint",
+        "name=build :: echo build",
+        ":::",
+        "after=build :: echo test",
+        "echo docs",
+    )
+    lint, build = process_group_manager._process_groups[0].processes
+    test, docs = process_group_manager._process_groups[1].processes
+    assert lint.dependencies == [] and build.dependencies == []
+    assert test.dependencies == [build]
+    assert docs.dependencies == [lint, build]
+
+
+def test_from_args_with_duplicate_name_modifier() -> None:
+    with pytest.raises(
+        InvalidNameModifierError,
+        match="name modifier 'a' is used by more than one command",
+    ):
+        ProcessGroupManager.from_args("name=a :: echo", "name=a :: echo")
+
+
+def test_from_args_with_unknown_after_modifier() -> None:
+    with pytest.raises(
+        InvalidAfterModifierError,
+        match="after modifier refers to unknown command name 'b'",
+    ):
+        ProcessGroupManager.from_args("name=a after=b :: echo")
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["name=a after=a :: echo"],
+        ["name=a after=b :: echo", "name=b after=a :: echo"],
+        ["name=a after=b :: echo", ":::", "name=b :: echo"],
+    ],
+)
+def test_from_args_with_dependency_cycle(args: list[str]) -> None:
+    with pytest.raises(
+        InvalidAfterModifierError, match="after modifier creates a dependency cycle"
+    ):
+        ProcessGroupManager.from_args(*args)
+
+
+def test_get_process() -> None:
+    pg_manager = ProcessGroupManager(
+        process_groups=[
+            ProcessGroup(id=1, processes=[Process(id=1, command="echo first")]),
+            ProcessGroup(id=2, processes=[Process(id=2, command="echo second")]),
+        ],
+    )
+    pg_manager.run()
+    assert pg_manager.get_process(2).process.command == "echo second"
+
+    pg_manager.get_process(1).process.wait()
+    pg_manager.run()
+    with pytest.raises(KeyError):
+        pg_manager.get_process(1)
+    assert pg_manager.get_process(2).id == 2
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import pytest
+
+from pyallel.colours import Colours
+from pyallel.constants import CLEAR_LINE
+from pyallel.printer import Printer
+from pyallel.process import Process
+from pyallel.process_group import ProcessGroup
+from pyallel.process_group_manager import ProcessGroupManager
+from pyallel.renderer import Renderer
+
+
+def test_render(capsys: pytest.CaptureFixture[str]) -> None:
+    pg_manager = ProcessGroupManager(
+        process_groups=[
+            ProcessGroup(id=1, processes=[Process(id=1, command="echo first")])
+        ],
+        jobs=1,
+    )
+    pg_manager.run()
+    renderer = Renderer(pg_manager, Printer(Colours.from_colour("no")))
+
+    renderer.render()
+    assert capsys.readouterr().out.startswith(f"{CLEAR_LINE}[echo first]")
+
+
+def test_render_without_process_group(capsys: pytest.CaptureFixture[str]) -> None:
+    pg_manager = ProcessGroupManager(process_groups=[])
+    renderer = Renderer(pg_manager, Printer(Colours.from_colour("no")))
+
+    renderer.render()
+    assert capsys.readouterr().out == ""
+
+
+def test_start_and_stop(capsys: pytest.CaptureFixture[str]) -> None:
+    pg_manager = ProcessGroupManager(
+        process_groups=[
+            ProcessGroup(id=1, processes=[Process(id=1, command="echo first")])
+        ],
+    )
+    pg_manager.run()
+    renderer = Renderer(pg_manager, Printer(Colours.from_colour("no")))
+
+    renderer.start()
+    renderer.update()
+    renderer.stop()
+    assert f"{CLEAR_LINE}[echo first]" in capsys.readouterr().out
+
+    # Nothing is drawn once the renderer has stopped
+    renderer.update()
+    assert capsys.readouterr().out == ""
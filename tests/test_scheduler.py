@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+from pyallel.cache import Cache
+from pyallel.engine import Engine
+from pyallel.history import History
+from pyallel.process import Process
+from pyallel.process_group import ProcessGroup
+from pyallel.scheduler import Scheduler, critical_paths
+
+
+def wait_for_exits(engine: Engine, *processes: Process) -> None:
+    while any(process.return_code() is None for process in processes):
+        engine.wait(1)
+
+
+def test_schedule_limits_running_processes() -> None:
+    engine = Engine()
+    scheduler = Scheduler(engine, jobs=2)
+    processes = [Process(i, "exit 0") for i in range(1, 5)]
+    scheduler.add(ProcessGroup(id=1, processes=processes))
+
+    assert scheduler.schedule() == processes[:2]
+    assert processes[2].queued and processes[3].queued
+    assert scheduler.schedule() == []
+
+    wait_for_exits(engine, *processes[:2])
+    assert scheduler.schedule() == processes[2:]
+
+
+def test_schedule_without_limit() -> None:
+    scheduler = Scheduler(Engine())
+    processes = [Process(i, "exit 0") for i in range(1, 5)]
+    scheduler.add(ProcessGroup(id=1, processes=processes))
+    assert scheduler.schedule() == processes
+
+
+def test_schedule_limits_running_processes_in_process_group() -> None:
+    engine = Engine()
+    scheduler = Scheduler(engine, jobs=3)
+    processes = [Process(i, "exit 0") for i in range(1, 4)]
+    others = [Process(i, "exit 0") for i in range(4, 6)]
+    scheduler.add(ProcessGroup(id=1, processes=processes, jobs=1))
+    scheduler.add(ProcessGroup(id=2, processes=others))
+
+    assert scheduler.schedule() == [processes[0], *others]
+    wait_for_exits(engine, processes[0])
+    assert scheduler.schedule() == [processes[1]]
+
+
+def test_cancel_skips_queued_processes() -> None:
+    scheduler = Scheduler(Engine(), jobs=1)
+    processes = [Process(i, "exit 0") for i in range(1, 3)]
+    process_group = ProcessGroup(id=1, processes=processes)
+    scheduler.add(process_group)
+    scheduler.schedule()
+    scheduler.cancel()
+
+    assert not processes[0].skipped
+    assert processes[1].skipped
+    assert processes[1].poll() is None
+    processes[0].wait()
+    assert process_group.poll() == 1
+    assert scheduler.schedule() == []
+
+
+def test_cancel_while_scheduling() -> None:
+    engine = Engine()
+    scheduler = Scheduler(engine, jobs=3)
+
+    class InterruptedProcess(Process):
+        def run(self, *args: Any, **kwargs: Any) -> None:
+            super().run(*args, **kwargs)
+            # As if a signal handler called cancel while this process was being started
+            scheduler.cancel()
+
+    dependency = Process(1, "exit 0")
+    waiting = Process(2, "exit 0")
+    waiting.dependencies = [dependency]
+    interrupted = InterruptedProcess(3, "exit 0")
+    scheduler.add(ProcessGroup(id=1, processes=[dependency, waiting, interrupted]))
+
+    assert scheduler.schedule() == [dependency, interrupted]
+    assert waiting.skipped
+
+    wait_for_exits(engine, dependency, interrupted)
+    assert scheduler.schedule() == []
+    assert waiting.queued is False and waiting.start == 0.0
+    assert scheduler.idle()
+
+
+def test_schedule_waits_for_dependencies() -> None:
+    engine = Engine()
+    scheduler = Scheduler(engine)
+    first, second, third = [Process(i, "exit 0") for i in range(1, 4)]
+    second.dependencies = [first]
+    third.dependencies = [first, second]
+    scheduler.add(ProcessGroup(id=1, processes=[first, second, third]))
+
+    assert scheduler.schedule() == [first]
+    wait_for_exits(engine, first)
+    assert scheduler.schedule() == [second]
+    wait_for_exits(engine, second)
+    assert scheduler.schedule() == [third]
+
+
+def test_schedule_skips_dependents_of_failed_processes() -> None:
+    engine = Engine()
+    scheduler = Scheduler(engine)
+    failed = Process(1, "exit 1")
+    other = Process(2, "exit 0")
+    dependent = Process(3, "exit 0")
+    dependent.dependencies = [failed]
+    transitive = Process(4, "exit 0")
+    transitive.dependencies = [other, dependent]
+    scheduler.add(ProcessGroup(id=1, processes=[failed, other, dependent, transitive]))
+
+    assert scheduler.schedule() == [failed, other]
+    wait_for_exits(engine, failed, other)
+    assert scheduler.schedule() == []
+    assert dependent.skipped
+    assert transitive.skipped
+
+
+def test_critical_paths() -> None:
+    build, lint, test, docs = [Process(i, f"{i}") for i in range(1, 5)]
+    test.dependencies = [build]
+    docs.dependencies = [build, lint]
+    estimates = {build: 1.0, lint: 5.0, test: 3.0, docs: 1.0}
+
+    paths = critical_paths([build, lint, test, docs], estimates.__getitem__)
+    assert paths == {build: 4.0, lint: 6.0, test: 3.0, docs: 1.0}
+
+
+def test_schedule_starts_longest_processes_first(tmp_path: Path) -> None:
+    history = History(str(tmp_path / "history.jsonl"))
+    history.record("sleep 0", 1.0)
+    history.record("exit 0", 2.0)
+    scheduler = Scheduler(Engine(), jobs=2, history=history)
+    processes = [Process(1, "true"), Process(2, "sleep 0"), Process(3, "exit 0")]
+    scheduler.add(ProcessGroup(id=1, processes=processes))
+
+    assert scheduler.schedule() == [processes[2], processes[1]]
+
+
+def test_schedule_records_durations(tmp_path: Path) -> None:
+    engine = Engine()
+    history = History(str(tmp_path / "history.jsonl"))
+    scheduler = Scheduler(engine, history=history)
+    processes = [Process(1, "sleep 0.1"), Process(2, "exit 1")]
+    scheduler.add(ProcessGroup(id=1, processes=processes))
+    scheduler.schedule()
+    wait_for_exits(engine, *processes)
+    scheduler.schedule()
+
+    assert (history.estimate("sleep 0.1") or 0) >= 0.1
+    assert history.estimate("exit 1") is None
+
+
+def test_eta() -> None:
+    scheduler = Scheduler(Engine(), jobs=1)
+    first, second, third = [Process(i, f"{i}") for i in range(1, 4)]
+    second.dependencies = [first]
+    first.estimate, second.estimate, third.estimate = 1.0, 2.0, 2.0
+
+    assert scheduler.eta([first, second]) == 3.0
+    # Only one job slot is free, so all the processes have to run one at a time
+    assert scheduler.eta([first, second, third]) == 5.0
+    scheduler.jobs = 2
+    assert scheduler.eta([first, second, third]) == 3.0
+
+    third.estimate = None
+    assert scheduler.eta([first, second, third]) is None
+    third.skip()
+    assert scheduler.eta([first, second, third]) == 3.0
+
+
+def test_schedule_replays_cached_output(tmp_path: Path) -> None:
+    engine = Engine()
+    cache = Cache(str(tmp_path / "results"))
+    scheduler = Scheduler(engine, cache=cache)
+    process = Process(1, "echo built", inputs=[str(tmp_path / "*.c")])
+    scheduler.add(ProcessGroup(id=1, processes=[process]))
+    scheduler.schedule()
+    wait_for_exits(engine, process)
+    scheduler.schedule()
+    assert not process.cached
+
+    scheduler = Scheduler(engine, cache=cache)
+    replayed = Process(1, "echo built", inputs=[str(tmp_path / "*.c")])
+    dependent = Process(2, "exit 0")
+    dependent.dependencies = [replayed]
+    scheduler.add(ProcessGroup(id=1, processes=[replayed, dependent]))
+    assert scheduler.schedule() == [replayed, dependent]
+    assert replayed.cached
+    assert replayed.poll() == 0
+    assert replayed.read() == b"built\n"
+
+
+def test_schedule_does_not_cache_failures(tmp_path: Path) -> None:
+    engine = Engine()
+    cache = Cache(str(tmp_path / "results"))
+    scheduler = Scheduler(engine, cache=cache)
+    process = Process(1, "echo failed; exit 1", inputs=["*.c"])
+    scheduler.add(ProcessGroup(id=1, processes=[process]))
+    scheduler.schedule()
+    wait_for_exits(engine, process)
+    scheduler.schedule()
+
+    assert cache.get(cache.key(process.command, ["*.c"], [])) is None
+
+
+def test_idle() -> None:
+    engine = Engine()
+    scheduler = Scheduler(engine, jobs=1)
+    assert scheduler.idle()
+
+    processes = [Process(i, "exit 0") for i in range(1, 3)]
+    scheduler.add(ProcessGroup(id=1, processes=processes))
+    assert not scheduler.idle()
+
+    scheduler.schedule()
+    assert not scheduler.idle()
+
+    wait_for_exits(engine, processes[0])
+    scheduler.schedule()
+    wait_for_exits(engine, processes[1])
+    scheduler.schedule()
+    assert scheduler.idle()